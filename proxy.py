@@ -9,16 +9,16 @@
     :license: BSD, see LICENSE for more details.
 """
 import argparse
-import asyncio
 import base64
 import contextlib
 import errno
 import functools
 import hashlib
+import heapq
+import hmac
 import importlib
-import inspect
-import io
 import ipaddress
+import itertools
 import json
 import logging
 import mimetypes
@@ -28,6 +28,7 @@ import pathlib
 import queue
 import secrets
 import selectors
+import signal
 import socket
 import ssl
 import struct
@@ -40,7 +41,7 @@ from multiprocessing import connection
 from multiprocessing.reduction import send_handle, recv_handle
 from types import TracebackType
 from typing import Any, Dict, List, Tuple, Optional, Union, NamedTuple, Callable, Type, TypeVar
-from typing import cast, Generator, TYPE_CHECKING
+from typing import cast, Generator, FrozenSet, Sequence, Set, TYPE_CHECKING
 from urllib import parse as urlparse
 
 from typing_extensions import Protocol
@@ -61,7 +62,7 @@ __download_url__ = '%s/archive/master.zip' % __homepage__
 __license__ = 'BSD'
 
 # Defaults
-DEFAULT_BACKLOG = 100
+DEFAULT_BACKLOG = 1024
 DEFAULT_BASIC_AUTH = None
 DEFAULT_BUFFER_SIZE = 1024 * 1024
 DEFAULT_CA_CERT_DIR = None
@@ -71,10 +72,13 @@ DEFAULT_CA_SIGNING_KEY_FILE = None
 DEFAULT_CERT_FILE = None
 DEFAULT_CLIENT_RECVBUF_SIZE = DEFAULT_BUFFER_SIZE
 DEFAULT_DEVTOOLS_WS_PATH = b'/devtools'
-DEFAULT_DISABLE_HEADERS: List[bytes] = []
+DEFAULT_DISABLE_HEADERS: FrozenSet[bytes] = frozenset()
 DEFAULT_DISABLE_HTTP_PROXY = False
 DEFAULT_ENABLE_DEVTOOLS = False
+# Linux load balances incoming connections across SO_REUSEPORT listeners.
+DEFAULT_ENABLE_REUSE_PORT = False
 DEFAULT_ENABLE_STATIC_SERVER = False
+DEFAULT_ENABLE_UPSTREAM_KEEP_ALIVE = False
 DEFAULT_ENABLE_WEB_SERVER = False
 DEFAULT_IPV4_HOSTNAME = ipaddress.IPv4Address('127.0.0.1')
 DEFAULT_IPV6_HOSTNAME = ipaddress.IPv6Address('::1')
@@ -90,6 +94,7 @@ DEFAULT_PID_FILE = None
 DEFAULT_PLUGINS = ''
 DEFAULT_PORT = 8899
 DEFAULT_SERVER_RECVBUF_SIZE = DEFAULT_BUFFER_SIZE
+DEFAULT_SHUTDOWN_TIMEOUT = 1
 DEFAULT_STATIC_SERVER_DIR = os.path.join(PROXY_PY_DIR, 'public')
 DEFAULT_THREADLESS = False
 DEFAULT_TIMEOUT = 10
@@ -104,6 +109,12 @@ def text_(s: Any, encoding: str = 'utf-8', errors: str = 'strict') -> Any:
 
     If s is of type bytes or int, return s.decode(encoding, errors),
     otherwise return s as it is."""
+    # Exact type checks are cheaper than isinstance for the common cases.
+    t = type(s)
+    if t is str:
+        return s
+    if t is bytes:
+        return s.decode(encoding, errors)
     if isinstance(s, int):
         return str(s)
     if isinstance(s, bytes):
@@ -116,6 +127,12 @@ def bytes_(s: Any, encoding: str = 'utf-8', errors: str = 'strict') -> Any:
 
     If s is type str or int, return s.encode(encoding, errors),
     otherwise return s as it is."""
+    # Exact type checks are cheaper than isinstance for the common cases.
+    t = type(s)
+    if t is bytes:
+        return s
+    if t is str:
+        return s.encode(encoding, errors)
     if isinstance(s, int):
         s = str(s)
     if isinstance(s, str):
@@ -125,6 +142,8 @@ def bytes_(s: Any, encoding: str = 'utf-8', errors: str = 'strict') -> Any:
 
 version = bytes_(__version__)
 CRLF, COLON, WHITESPACE, COMMA, DOT, SLASH, HTTP_1_1 = b'\r\n', b':', b' ', b',', b'.', b'/', b'HTTP/1.1'
+SEMICOLON = b';'
+HTTP_1_1_STATUS_PREFIX = HTTP_1_1 + WHITESPACE
 PROXY_AGENT_HEADER_KEY = b'Proxy-agent'
 PROXY_AGENT_HEADER_VALUE = b'proxy.py v' + version
 PROXY_AGENT_HEADER = PROXY_AGENT_HEADER_KEY + \
@@ -200,6 +219,10 @@ httpMethods = HttpMethods(
     b'TRACE',
     b'PATCH',
 )
+# Canonical httpMethods value for methods as commonly received on the wire.
+# Avoids upper() per request and lets comparisons hit the identity fast path.
+httpMethodsByName: Dict[bytes, bytes] = {m: m for m in httpMethods}
+httpMethodsByName.update({m.lower(): m for m in httpMethods})
 
 HttpParserStates = NamedTuple('HttpParserStates', [
     ('INITIALIZED', int),
@@ -257,17 +280,11 @@ def build_http_response(status_code: int,
         line.append(reason)
     if headers is None:
         headers = {}
-    has_content_length = False
-    has_transfer_encoding = False
-    for k in headers:
-        if k.lower() == b'content-length':
-            has_content_length = True
-        if k.lower() == b'transfer-encoding':
-            has_transfer_encoding = True
-    if body is not None and \
-            not has_transfer_encoding and \
-            not has_content_length:
-        headers[b'Content-Length'] = bytes_(len(body))
+    if body is not None:
+        keys = {k.lower() for k in headers}
+        if b'content-length' not in keys and \
+                b'transfer-encoding' not in keys:
+            headers[b'Content-Length'] = bytes_(len(body))
     return build_http_pkt(line, headers, body)
 
 
@@ -280,14 +297,14 @@ def build_http_pkt(line: List[bytes],
                    headers: Optional[Dict[bytes, bytes]] = None,
                    body: Optional[bytes] = None) -> bytes:
     """Build and returns a HTTP request or response packet."""
-    req = WHITESPACE.join(line) + CRLF
+    pkt = [WHITESPACE.join(line), CRLF]
     if headers is not None:
-        for k in headers:
-            req += build_http_header(k, headers[k]) + CRLF
-    req += CRLF
+        for k, v in headers.items():
+            pkt += (k, COLON, WHITESPACE, v, CRLF)
+    pkt.append(CRLF)
     if body:
-        req += body
-    return req
+        pkt.append(body)
+    return b''.join(pkt)
 
 
 def build_websocket_handshake_request(
@@ -340,20 +357,51 @@ def find_http_line(raw: bytes) -> Tuple[Optional[bytes], bytes]:
     return line, rest
 
 
-def new_socket_connection(addr: Tuple[str, int]) -> socket.socket:
-    conn = None
+def split_authority(authority: bytes) -> Tuple[bytes, Optional[int]]:
+    """Splits host[:port] authority e.g. CONNECT request target into lowercased host and port.
+
+    IPv6 literals must be enclosed in brackets e.g. [::1]:443.  Port is None when absent."""
+    if authority.startswith(b'['):
+        end = authority.find(b']')
+        if end == -1:
+            raise ValueError('Invalid IPv6 authority %r' % authority)
+        host, rest = authority[1:end], authority[end + 1:]
+        if rest == b'':
+            return host.lower(), None
+        if not rest.startswith(COLON):
+            raise ValueError('Invalid authority %r' % authority)
+        port = rest[1:]
+    else:
+        host, _, port = authority.rpartition(COLON)
+        if not _:
+            return authority.lower(), None
+    if not port.isdigit():
+        raise ValueError('Invalid port in authority %r' % authority)
+    return host.lower(), int(port)
+
+
+@functools.lru_cache(maxsize=4096)
+def ip_address_version(host: str) -> Optional[int]:
+    """Returns IP version of host, None if host is not an IPv4 or IPv6 address.
+
+    Cached because a proxy keeps connecting to a small set of upstream hosts."""
     try:
-        ip = ipaddress.ip_address(addr[0])
-        if ip.version == 4:
-            conn = socket.socket(
-                socket.AF_INET, socket.SOCK_STREAM, 0)
-            conn.connect(addr)
-        else:
-            conn = socket.socket(
-                socket.AF_INET6, socket.SOCK_STREAM, 0)
-            conn.connect((addr[0], addr[1], 0, 0))
+        return ipaddress.ip_address(host).version
     except ValueError:
-        pass    # does not appear to be an IPv4 or IPv6 address
+        return None
+
+
+def new_socket_connection(addr: Tuple[str, int]) -> socket.socket:
+    conn = None
+    ip_version = ip_address_version(addr[0])
+    if ip_version == 4:
+        conn = socket.socket(
+            socket.AF_INET, socket.SOCK_STREAM, 0)
+        conn.connect(addr)
+    elif ip_version == 6:
+        conn = socket.socket(
+            socket.AF_INET6, socket.SOCK_STREAM, 0)
+        conn.connect((addr[0], addr[1], 0, 0))
 
     if conn is not None:
         return conn
@@ -362,6 +410,72 @@ def new_socket_connection(addr: Tuple[str, int]) -> socket.socket:
     return socket.create_connection(addr)
 
 
+ClientQueueType = Union[connection.Connection, socket.socket]
+
+# Accepted client address as sent along with its fd: is IPv6, packed ip, port
+CLIENT_ADDR = struct.Struct('!?16sH')
+
+
+def new_client_queue() -> Tuple[ClientQueueType, ClientQueueType]:
+    """Returns a channel to pass accepted client connections between processes.
+
+    Prefers a SOCK_SEQPACKET unix socket pair, over which fd and address are
+    sent in a single message.  Falls back to multiprocessing.Pipe."""
+    if hasattr(socket, 'AF_UNIX') and hasattr(socket, 'SOCK_SEQPACKET'):
+        try:
+            return socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        except OSError:
+            pass
+    return multiprocessing.Pipe()
+
+
+def send_client(queue: ClientQueueType, fileno: int, addr: Tuple[str, int], pid: Optional[int]) -> None:
+    if isinstance(queue, connection.Connection):
+        queue.send(addr)
+        send_handle(queue, fileno, pid)
+        return
+    host = addr[0].partition('%')[0]    # Drop IPv6 scope id
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    queue.sendmsg(
+        [CLIENT_ADDR.pack(family == socket.AF_INET6, socket.inet_pton(family, host), addr[1])],
+        [(socket.SOL_SOCKET, socket.SCM_RIGHTS, struct.pack('i', fileno))])
+
+
+def recv_client(queue: ClientQueueType) -> Tuple[int, Tuple[str, int]]:
+    """Returns fd and address of a client connection sent using send_client."""
+    if isinstance(queue, connection.Connection):
+        addr = queue.recv()
+        return recv_handle(queue), addr
+    msg, ancdata, _, _ = queue.recvmsg(
+        CLIENT_ADDR.size, socket.CMSG_SPACE(struct.calcsize('i')))
+    fileno = None
+    for level, kind, data in ancdata:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            fileno = struct.unpack('i', data[:struct.calcsize('i')])[0]
+    if fileno is None:
+        raise EOFError('Client queue closed')
+    is_ipv6, packed, port = CLIENT_ADDR.unpack(msg)
+    if is_ipv6:
+        return fileno, (socket.inet_ntop(socket.AF_INET6, packed), port)
+    return fileno, (socket.inet_ntop(socket.AF_INET, packed[:4]), port)
+
+
+def join_processes(processes: Sequence[multiprocessing.Process],
+                   timeout: float = DEFAULT_SHUTDOWN_TIMEOUT) -> None:
+    """Waits for processes to exit, interrupting those still alive after timeout.
+
+    Ctrl-C reaches the whole process group, but SIGTERM is usually
+    delivered to the main process only."""
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(deadline - time.monotonic(), 0))
+    for process in processes:
+        if process.is_alive() and process.pid is not None:
+            os.kill(process.pid, signal.SIGINT)
+    for process in processes:
+        process.join()
+
+
 class socket_connection(contextlib.ContextDecorator):
     """Same as new_socket_connection but as a context manager and decorator."""
 
@@ -410,9 +524,22 @@ class TcpConnection(ABC):
     a socket connection object."""
 
     def __init__(self, tag: int):
-        self.buffer: bytes = b''
+        # Pending data lives in _buf starting at offset _start.  Flushed bytes
+        # are only dropped once they make up more than half of _buf, which
+        # keeps queue() and flush() linear in the number of bytes written.
+        self._buf: bytearray = bytearray()
+        self._start: int = 0
+        # Guards _buf and _start, data may be queued from threads other than
+        # the one flushing (e.g. devtools event dispatcher).  Resizing _buf
+        # while flush holds a memoryview into it raises BufferError.
+        self._buf_lock: threading.Lock = threading.Lock()
+        # Lazily created pipe used by splice_to
+        self._pipe: Optional[Tuple[int, int]] = None
         self.closed: bool = False
         self.tag: str = 'server' if tag == tcpConnectionTypes.SERVER else 'client'
+        # Set by event loop owning this connection.  Threads queueing data
+        # call it so that the loop starts waiting for writability right away.
+        self.wakeup: Optional[Callable[[], None]] = None
 
     @property
     @abstractmethod
@@ -420,45 +547,119 @@ class TcpConnection(ABC):
         """Must return the socket connection to use in this class."""
         raise TcpConnectionUninitializedException()     # pragma: no cover
 
-    def send(self, data: bytes) -> int:
+    def send(self, data: Union[bytes, memoryview]) -> int:
         """Users must handle BrokenPipeError exceptions"""
         return self.connection.send(data)
 
+    # Receive buffer shared by connections handled in same thread.
+    # Per connection buffers would pin recvbuf_size bytes per connection.
+    _recv_local = threading.local()
+
     def recv(self, buffer_size: int = DEFAULT_BUFFER_SIZE) -> Optional[bytes]:
-        """Users must handle socket.error exceptions"""
-        data: bytes = self.connection.recv(buffer_size)
-        if len(data) == 0:
+        """Users must handle socket.error exceptions
+
+        Reads into a reusable buffer, so that only received bytes are copied
+        out instead of allocating buffer_size bytes for every read."""
+        buf: Optional[bytearray] = getattr(self._recv_local, 'buf', None)
+        if buf is None or len(buf) < buffer_size:
+            buf = self._recv_local.buf = bytearray(buffer_size)
+        n = self.connection.recv_into(buf, buffer_size)
+        if n == 0:
             return None
-        logger.debug(
-            'received %d bytes from %s' %
-            (len(data), self.tag))
-        # logger.info(data)
-        return data
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('received %d bytes from %s', n, self.tag)
+        # logger.info(buf[:n])
+        return bytes(memoryview(buf)[:n])
 
     def close(self) -> bool:
         if not self.closed:
             self.connection.close()
             self.closed = True
+        if self._pipe is not None:
+            os.close(self._pipe[0])
+            os.close(self._pipe[1])
+            self._pipe = None
         return self.closed
 
+    def can_splice_to(self, dst: 'TcpConnection') -> bool:
+        """Returns True if data received on this connection can be
+        moved to dst using splice_to.
+
+        Requires os.splice (Linux, Python 3.10+), plain non-TLS sockets
+        on both ends and no pending dst buffer, which must be flushed first
+        to preserve ordering of data."""
+        return hasattr(os, 'splice') and \
+            not dst.has_buffer() and \
+            isinstance(self.connection, socket.socket) and \
+            not isinstance(self.connection, ssl.SSLSocket) and \
+            isinstance(dst.connection, socket.socket) and \
+            not isinstance(dst.connection, ssl.SSLSocket)
+
+    def splice_to(self, dst: 'TcpConnection', buffer_size: int = DEFAULT_BUFFER_SIZE) -> Optional[int]:
+        """Moves data received on this connection into dst within the kernel.
+
+        Returns number of bytes moved, None if connection was closed by peer.
+        Bytes that dst cannot accept right away are read back and queued
+        into dst buffer.  Users must handle socket.error exceptions."""
+        if self._pipe is None:
+            self._pipe = os.pipe()
+        r, w = self._pipe
+        flags = os.SPLICE_F_MOVE | os.SPLICE_F_NONBLOCK
+        received = os.splice(self.connection.fileno(), w, buffer_size, flags=flags)
+        if received == 0:
+            return None
+        sent = 0
+        try:
+            while sent < received:
+                sent += os.splice(r, dst.connection.fileno(), received - sent, flags=flags)
+        except BlockingIOError:
+            pass
+        finally:
+            # Never leave data behind in the pipe
+            while sent < received:
+                data = os.read(r, received - sent)
+                dst.queue(data)
+                sent += len(data)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('spliced %d bytes from %s to %s', received, self.tag, dst.tag)
+        return received
+
+    @property
+    def buffer(self) -> bytes:
+        """Returns a copy of data queued but not yet flushed."""
+        return bytes(memoryview(self._buf)[self._start:])
+
+    @buffer.setter
+    def buffer(self, data: bytes) -> None:
+        with self._buf_lock:
+            self._buf = bytearray(data)
+            self._start = 0
+
     def buffer_size(self) -> int:
-        return len(self.buffer)
+        return len(self._buf) - self._start
 
     def has_buffer(self) -> bool:
         return self.buffer_size() > 0
 
     def queue(self, data: bytes) -> int:
-        self.buffer += data
+        with self._buf_lock:
+            self._buf += data
         return len(data)
 
     def flush(self) -> int:
         """Users must handle BrokenPipeError exceptions"""
         if self.buffer_size() == 0:
             return 0
-        sent: int = self.send(self.buffer)
-        # logger.info(self.buffer[:sent])
-        self.buffer = self.buffer[sent:]
-        logger.debug('flushed %d bytes to %s' % (sent, self.tag))
+        with self._buf_lock:
+            sent: int = self.send(memoryview(self._buf)[self._start:])
+            # logger.info(self._buf[self._start:self._start + sent])
+            self._start += sent
+            if self._start == len(self._buf):
+                self._buf, self._start = bytearray(), 0
+            elif self._start > len(self._buf) // 2:
+                self._buf, self._start = self._buf[self._start:], 0
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('flushed %d bytes to %s', sent, self.tag)
         return sent
 
 
@@ -504,58 +705,73 @@ class ChunkParser:
 
     def __init__(self) -> None:
         self.state = chunkParserStates.WAITING_FOR_SIZE
-        self.body: bytes = b''  # Parsed chunks
-        self.chunk: bytes = b''  # Partial chunk received
+        self.body: bytearray = bytearray()  # Parsed chunks
+        self.chunk: bytearray = bytearray()  # Partial chunk received
         # Expected size of next following chunk
         self.size: Optional[int] = None
 
     def parse(self, raw: bytes) -> bytes:
-        more = True if len(raw) > 0 else False
-        while more and self.state != chunkParserStates.COMPLETE:
-            more, raw = self.process(raw)
-        return raw
+        # Consume prior chunk in buffer
+        # in case chunk size without CRLF was received
+        if self.state == chunkParserStates.WAITING_FOR_SIZE and self.chunk:
+            raw = bytes(self.chunk) + raw
+            self.chunk.clear()
+        # Walk raw using an offset instead of re-slicing it for every state
+        cur, end = 0, len(raw)
+        while cur < end and self.state != chunkParserStates.COMPLETE:
+            cur = self.process(raw, cur)
+        return raw[cur:]
+
+    def process(self, raw: bytes, cur: int = 0) -> int:
+        """Process raw starting at offset cur.
 
-    def process(self, raw: bytes) -> Tuple[bool, bytes]:
+        Returns offset of the first byte which was not consumed."""
         if self.state == chunkParserStates.WAITING_FOR_SIZE:
-            # Consume prior chunk in buffer
-            # in case chunk size without CRLF was received
-            raw = self.chunk + raw
-            self.chunk = b''
             # Extract following chunk data size
-            line, raw = find_http_line(raw)
-            # CRLF not received or Blank line was received.
-            if line is None or line.strip() == b'':
-                self.chunk = raw
-                raw = b''
-            else:
+            pos = raw.find(CRLF, cur)
+            # CRLF not received, buffer partial chunk size line.
+            if pos == -1:
+                self.chunk += raw[cur:]
+                return len(raw)
+            # Ignore chunk extensions, if any, following the size
+            ext = raw.find(SEMICOLON, cur, pos)
+            line = raw[cur:pos if ext == -1 else ext]
+            # Blank line received, skip it.
+            if line and not line.isspace():
                 self.size = int(line, 16)
                 self.state = chunkParserStates.WAITING_FOR_DATA
+            return pos + len(CRLF)
         elif self.state == chunkParserStates.WAITING_FOR_DATA:
             assert self.size is not None
             remaining = self.size - len(self.chunk)
-            self.chunk += raw[:remaining]
-            raw = raw[remaining:]
-            if len(self.chunk) == self.size:
-                raw = raw[len(CRLF):]
+            if len(self.chunk) == 0 and len(raw) - cur >= remaining:
+                # Entire chunk is available, copy it straight into body
+                self.body += raw[cur:cur + remaining]
+            else:
+                self.chunk += raw[cur:cur + remaining]
+                if len(self.chunk) < self.size:
+                    return len(raw)
                 self.body += self.chunk
-                if self.size == 0:
-                    self.state = chunkParserStates.COMPLETE
-                else:
-                    self.state = chunkParserStates.WAITING_FOR_SIZE
-                self.chunk = b''
-                self.size = None
-        return len(raw) > 0, raw
+                self.chunk.clear()
+            cur += remaining + len(CRLF)
+            if self.size == 0:
+                self.state = chunkParserStates.COMPLETE
+            else:
+                self.state = chunkParserStates.WAITING_FOR_SIZE
+            self.size = None
+        return min(cur, len(raw))
 
     @staticmethod
     def to_chunks(raw: bytes, chunk_size: int = DEFAULT_BUFFER_SIZE) -> bytes:
-        chunks: List[bytes] = []
+        chunks = bytearray()
+        view = memoryview(raw)
         for i in range(0, len(raw), chunk_size):
-            chunk = raw[i: i + chunk_size]
-            chunks.append(bytes_('{:x}'.format(len(chunk))))
-            chunks.append(chunk)
-        chunks.append(bytes_('{:x}'.format(0)))
-        chunks.append(b'')
-        return CRLF.join(chunks) + CRLF
+            chunk = view[i: i + chunk_size]
+            chunks += b'%x\r\n' % len(chunk)
+            chunks += chunk
+            chunks += CRLF
+        chunks += b'0\r\n\r\n'
+        return bytes(chunks)
 
 
 T = TypeVar('T', bound='HttpParser')
@@ -566,16 +782,24 @@ class HttpParser:
 
     def __init__(self, parser_type: int) -> None:
         self.type: int = parser_type
+        self.reset()
+
+    def reset(self) -> None:
+        """Resets parser in-place so that it can be reused for parsing next message."""
         self.state: int = httpParserStates.INITIALIZED
 
-        # Raw bytes as passed to parse(raw) method and its total size
-        self.bytes: bytes = b''
+        # Total size of raw bytes passed to parse(raw) method and last
+        # few of those bytes, only needed to detect a trailing CRLF * 2
         self.total_size: int = 0
+        self.tail: bytes = b''
 
         # Buffer to hold unprocessed bytes
         self.buffer: bytes = b''
 
+        # Keyed by lowercase header name.  Use add_header / del_header to
+        # modify headers, they also keep chunked flag in sync.
         self.headers: Dict[bytes, Tuple[bytes, bytes]] = dict()
+        self.chunked: bool = False
         self.body: Optional[bytes] = None
 
         self.method: Optional[bytes] = None
@@ -606,60 +830,71 @@ class HttpParser:
         return parser
 
     def header(self, key: bytes) -> bytes:
-        if key.lower() not in self.headers:
+        try:
+            return self.headers[key.lower()][1]
+        except KeyError:
             raise KeyError('%s not found in headers', text_(key))
-        return self.headers[key.lower()][1]
 
     def has_header(self, key: bytes) -> bool:
         return key.lower() in self.headers
 
     def add_header(self, key: bytes, value: bytes) -> None:
-        self.headers[key.lower()] = (key, value)
+        k = key.lower()
+        self.headers[k] = (key, value)
+        if k == b'transfer-encoding':
+            self.chunked = value.lower() == b'chunked'
 
     def add_headers(self, headers: List[Tuple[bytes, bytes]]) -> None:
         for (key, value) in headers:
             self.add_header(key, value)
 
     def del_header(self, header: bytes) -> None:
-        if header.lower() in self.headers:
-            del self.headers[header.lower()]
+        k = header.lower()
+        if self.headers.pop(k, None) is not None and k == b'transfer-encoding':
+            self.chunked = False
 
     def del_headers(self, headers: List[bytes]) -> None:
         for key in headers:
-            self.del_header(key.lower())
+            self.del_header(key)
 
     def set_url(self, url: bytes) -> None:
-        self.url = urlparse.urlsplit(url)
+        if self.method == httpMethods.CONNECT:
+            # CONNECT target is always an authority, skip urlsplit which
+            # also misreads host:port as scheme:path on newer Pythons.
+            self.url = urlparse.SplitResultBytes(b'', b'', url, b'', b'')
+        else:
+            self.url = urlparse.urlsplit(url)
         self.set_line_attributes()
 
     def set_line_attributes(self) -> None:
         if self.type == httpParserTypes.REQUEST_PARSER:
             if self.method == httpMethods.CONNECT and self.url:
-                u = urlparse.urlsplit(b'//' + self.url.path)
-                self.host, self.port = u.hostname, u.port
+                self.host, self.port = split_authority(self.url.path)
             elif self.url:
                 self.host, self.port = self.url.hostname, self.url.port \
                     if self.url.port else 80
             else:
-                raise KeyError('Invalid request\n%s' % self.bytes)
+                raise KeyError('Invalid request')
             self.path = self.build_url()
 
     def is_chunked_encoded(self) -> bool:
-        return b'transfer-encoding' in self.headers and \
-            self.headers[b'transfer-encoding'][1].lower() == b'chunked'
+        return self.chunked
 
     def parse(self, raw: bytes) -> None:
         """Parses Http request out of raw bytes.
 
         Check HttpParser state after parse has successfully returned."""
-        self.bytes += raw
         self.total_size += len(raw)
+        self.tail = raw[-4:] if len(raw) >= 4 else (self.tail + raw)[-4:]
 
         # Prepend past buffer
-        raw = self.buffer + raw
+        if self.buffer:
+            raw = self.buffer + raw
         self.buffer = b''
 
-        more = True if len(raw) > 0 else False
+        # Walk raw using an offset, only slicing out lines and body
+        cur, end = 0, len(raw)
+        more = cur < end
         while more and self.state != httpParserStates.COMPLETE:
             if self.state in (
                     httpParserStates.HEADERS_COMPLETE,
@@ -669,29 +904,37 @@ class HttpParser:
                     if self.body is None:
                         self.body = b''
                     total_size = int(self.header(b'content-length'))
-                    received_size = len(self.body)
-                    self.body += raw[:total_size - received_size]
-                    if self.body and \
-                            len(self.body) == int(self.header(b'content-length')):
+                    pending = total_size - len(self.body)
+                    self.body += raw[cur:cur + pending]
+                    if len(self.body) == total_size:
                         self.state = httpParserStates.COMPLETE
-                    more, raw = len(raw) > 0, raw[total_size - received_size:]
+                    cur = min(cur + pending, end)
                 elif self.is_chunked_encoded():
                     if not self.chunk_parser:
                         self.chunk_parser = ChunkParser()
-                    raw = self.chunk_parser.parse(raw)
+                    raw, cur, end = self.chunk_parser.parse(raw[cur:]), 0, 0
                     if self.chunk_parser.state == chunkParserStates.COMPLETE:
-                        self.body = self.chunk_parser.body
+                        self.body = bytes(self.chunk_parser.body)
                         self.state = httpParserStates.COMPLETE
-                    more = False
+                    break
+                else:
+                    # Body without message framing, nothing more to parse
+                    break
+                more = cur < end
             else:
-                more, raw = self.process(raw)
-        self.buffer = raw
+                more, cur = self.process(raw, cur)
+        self.buffer = raw[cur:]
+
+    def process(self, raw: bytes, cur: int = 0) -> Tuple[bool, int]:
+        """Process a single line from raw starting at offset cur.
 
-    def process(self, raw: bytes) -> Tuple[bool, bytes]:
-        """Returns False when no CRLF could be found in received bytes."""
-        line, raw = find_http_line(raw)
-        if line is None:
-            return False, raw
+        Returns False when no CRLF could be found in received bytes
+        along with offset of the first byte which was not consumed."""
+        pos = raw.find(CRLF, cur)
+        if pos == -1:
+            return False, cur
+        line = raw[cur:pos]
+        cur = pos + len(CRLF)
 
         if self.state == httpParserStates.INITIALIZED:
             self.process_line(line)
@@ -711,7 +954,7 @@ class HttpParser:
         # for details
         if self.state == httpParserStates.LINE_RCVD and \
                 self.type == httpParserTypes.RESPONSE_PARSER and \
-                raw == CRLF:
+                len(raw) - cur == len(CRLF) and raw.endswith(CRLF):
             self.state = httpParserStates.COMPLETE
         # When raw request has ended with \r\n\r\n and no more http headers are expected
         # See `TestHttpParser.test_request_parse_without_content_length` and
@@ -719,7 +962,7 @@ class HttpParser:
         elif self.state == httpParserStates.HEADERS_COMPLETE and \
                 self.type == httpParserTypes.REQUEST_PARSER and \
                 self.method != httpMethods.POST and \
-                self.bytes.endswith(CRLF * 2):
+                self.tail == CRLF * 2:
             self.state = httpParserStates.COMPLETE
         elif self.state == httpParserStates.HEADERS_COMPLETE and \
                 self.type == httpParserTypes.REQUEST_PARSER and \
@@ -728,27 +971,27 @@ class HttpParser:
                 (b'content-length' not in self.headers or
                  (b'content-length' in self.headers and
                   int(self.headers[b'content-length'][1]) == 0)) and \
-                self.bytes.endswith(CRLF * 2):
+                self.tail == CRLF * 2:
             self.state = httpParserStates.COMPLETE
 
-        return len(raw) > 0, raw
+        return cur < len(raw), cur
 
     def process_line(self, raw: bytes) -> None:
-        line = raw.split(WHITESPACE)
+        # Bounded split, reason phrase may itself contain whitespace.
+        line = raw.split(WHITESPACE, 2)
         if self.type == httpParserTypes.REQUEST_PARSER:
-            self.method = line[0].upper()
+            self.method = httpMethodsByName.get(line[0]) or line[0].upper()
             self.set_url(line[1])
             self.version = line[2]
         else:
             self.version = line[0]
             self.code = line[1]
-            self.reason = WHITESPACE.join(line[2:])
+            self.reason = line[2] if len(line) > 2 else b''
 
     def process_header(self, raw: bytes) -> None:
-        parts = raw.split(COLON)
-        key = parts[0].strip()
-        value = COLON.join(parts[1:]).strip()
-        self.add_headers([(key, value)])
+        # Header values may contain colons, e.g. Host: localhost:8080
+        key, _, value = raw.partition(COLON)
+        self.add_header(key.strip(), value.strip())
 
     def build_url(self) -> bytes:
         if not self.url:
@@ -762,7 +1005,7 @@ class HttpParser:
             url += b'#' + self.url.fragment
         return url
 
-    def build(self, disable_headers: Optional[List[bytes]] = None) -> bytes:
+    def build(self, disable_headers: Optional[FrozenSet[bytes]] = None) -> bytes:
         assert self.method and self.version and self.path
         if disable_headers is None:
             disable_headers = DEFAULT_DISABLE_HEADERS
@@ -771,8 +1014,9 @@ class HttpParser:
             self.body
         return build_http_request(
             self.method, self.path, self.version,
-            headers={} if not self.headers else {self.headers[k][0]: self.headers[k][1] for k in self.headers if
-                                                 k.lower() not in disable_headers},
+            # Keys are already lowercase, values hold original header name and value
+            headers={} if not self.headers else {
+                name: value for k, (name, value) in self.headers.items() if k not in disable_headers},
             body=body
         )
 
@@ -792,6 +1036,10 @@ class AcceptorPool:
     Pre-spawns worker processes to utilize all cores available on the system.  Server socket connection is
     dispatched over a pipe to workers.  Each worker accepts incoming client request and spawns a
     separate thread to handle the client request.
+
+    When reuse_port is True, each worker instead binds its own SO_REUSEPORT listening socket
+    and kernel distributes incoming connections across them.  Pool reserves the address before
+    starting workers and waits for all of them to listen, failing fast on bind errors.
     """
 
     def __init__(self,
@@ -800,13 +1048,16 @@ class AcceptorPool:
                  port: int, backlog: int, num_workers: int,
                  threadless: bool,
                  work_klass: type,
+                 reuse_port: bool = DEFAULT_ENABLE_REUSE_PORT,
                  **kwargs: Any) -> None:
         self.threadless = threadless
+        self.reuse_port = reuse_port
         self.running: bool = False
 
         self.hostname: Union[ipaddress.IPv4Address,
                              ipaddress.IPv6Address] = hostname
         self.port: int = port
+        self.addr: Tuple[str, int] = (str(hostname), port)
         self.family: socket.AddressFamily = socket.AF_INET6 if hostname.version == 6 else socket.AF_INET
         self.backlog: int = backlog
         self.socket: Optional[socket.socket] = None
@@ -821,38 +1072,99 @@ class AcceptorPool:
     def listen(self) -> None:
         self.socket = socket.socket(self.family, socket.SOCK_STREAM)
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.socket.bind((str(self.hostname), self.port))
+        self.socket.bind(self.addr)
         self.socket.listen(self.backlog)
         self.socket.setblocking(False)
         logger.info('Listening on %s:%d' % (self.hostname, self.port))
 
+    def reserve_port(self) -> None:
+        """Binds, without listening, the first SO_REUSEPORT socket on address.
+
+        Raises if address is already taken, including by another proxy.py
+        instance using SO_REUSEPORT, which would otherwise silently share it."""
+        with socket.socket(self.family, socket.SOCK_STREAM) as probe:
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            probe.bind(self.addr)
+        self.socket = socket.socket(self.family, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        # Kernel only routes connections to listening sockets
+        self.socket.bind(self.addr)
+
+    def wait_for_workers(self) -> None:
+        """Blocks until every worker listens, shuts down pool and raises on bind error."""
+        errors: List[Exception] = []
+        for work_queue in self.work_queues:
+            try:
+                error = work_queue.recv()
+            except EOFError:
+                error = OSError('Acceptor exited before listening')
+            if error is not None:
+                errors.append(error)
+        if errors:
+            self.shutdown()
+            raise errors[0]
+
     def start_workers(self) -> None:
         """Start worker processes."""
         for _ in range(self.num_acceptors):
-            work_queue = multiprocessing.Pipe()
-            acceptor = Acceptor(
-                self.family,
-                self.threadless,
-                work_queue[1],
-                self.work_klass,
-                **self.kwargs
-            )
+            if self.reuse_port:
+                # Acceptor reports back whether it could listen
+                work_queue = multiprocessing.Pipe()
+                acceptor = Acceptor(
+                    self.family,
+                    self.threadless,
+                    work_queue[1],
+                    self.work_klass,
+                    listen_addr=self.addr,
+                    backlog=self.backlog,
+                    **self.kwargs
+                )
+                self.work_queues.append(work_queue[0])
+            else:
+                work_queue = multiprocessing.Pipe()
+                acceptor = Acceptor(
+                    self.family,
+                    self.threadless,
+                    work_queue[1],
+                    self.work_klass,
+                    **self.kwargs
+                )
+                self.work_queues.append(work_queue[0])
             # acceptor.daemon = True
             acceptor.start()
             self.acceptors.append(acceptor)
-            self.work_queues.append(work_queue[0])
+            if self.reuse_port:
+                # Parent's copy closed so recv raises EOFError if acceptor dies
+                work_queue[1].close()
         logger.info('Started %d workers' % self.num_acceptors)
 
     def shutdown(self) -> None:
         logger.info('Shutting down %d workers' % self.num_acceptors)
-        for acceptor in self.acceptors:
-            acceptor.join()
+        join_processes(self.acceptors)
         for work_queue in self.work_queues:
             work_queue.close()
 
     def setup(self) -> None:
         """Listen on port, setup workers and pass server socket to workers."""
         self.running = True
+        if self.reuse_port and not hasattr(socket, 'SO_REUSEPORT'):
+            logger.warning('SO_REUSEPORT disabled, not supported on this platform')
+            self.reuse_port = False
+        if self.reuse_port and self.port == 0:
+            logger.warning('SO_REUSEPORT disabled, workers would each bind a different ephemeral port')
+            self.reuse_port = False
+        if self.reuse_port:
+            # Workers bind their own listening sockets.
+            self.reserve_port()
+            assert self.socket is not None
+            try:
+                self.start_workers()
+                self.wait_for_workers()
+            finally:
+                self.socket.close()
+            logger.info('Listening on %s:%d' % (self.hostname, self.port))
+            return
         self.listen()
         self.start_workers()
 
@@ -894,6 +1206,18 @@ class ThreadlessWork(ABC):
         """Must close any opened resources."""
         pass    # pragma: no cover
 
+    def set_wakeup(self, wakeup: Callable[[], None]) -> None:
+        """Receives a thread-safe callable which makes Threadless re-sync events of this work."""
+        pass    # pragma: no cover
+
+    @classmethod
+    def housekeeping(cls, **kwargs: Any) -> Optional[float]:
+        """Called periodically by the event loop running works of this class.
+
+        Receives the same keyword arguments works are created with.  Returns
+        seconds until it must be called again, None if nothing is pending."""
+        return None
+
 
 class Threadless(multiprocessing.Process):
     """Threadless provides an event loop.  Use it by implementing Threadless class.
@@ -901,15 +1225,19 @@ class Threadless(multiprocessing.Process):
     When --threadless option is enabled, each Acceptor process also
     spawns one Threadless process.  And instead of spawning new thread
     for each accepted client connection, Acceptor process sends
-    accepted client connection to Threadless process over a pipe.
+    accepted client connection to Threadless process over a unix socket
+    (or a pipe where SOCK_SEQPACKET is unavailable).
 
     ProtocolHandler implements ThreadlessWork class and hooks into the
     event loop provided by Threadless.
     """
 
+    # Each work is checked for inactivity at most once per interval (in seconds)
+    INACTIVITY_CHECK_INTERVAL = 1.0
+
     def __init__(
             self,
-            client_queue: connection.Connection,
+            client_queue: ClientQueueType,
             work_klass: type,
             **kwargs: Any) -> None:
         super().__init__()
@@ -918,78 +1246,147 @@ class Threadless(multiprocessing.Process):
         self.kwargs = kwargs
 
         self.works: Dict[int, ThreadlessWork] = {}
+        # Events registered with selector on behalf of each work,
+        # and reverse mapping of registered descriptor to its work
+        self.registered: Dict[int, Dict[socket.socket, int]] = {}
+        self.owners: Dict[socket.socket, int] = {}
+        # Min-heap of (next inactivity check time, work id).  next_check holds
+        # the current check time of each work, heap entries not matching it are stale.
+        self.inactivity_checks: List[Tuple[float, int]] = []
+        self.next_check: Dict[int, float] = {}
+        # Works whose interest may have changed since last sync.  Events only
+        # change within handle_events, except for buffers queued from other
+        # threads.  Those threads call wake, which records the work in woken
+        # and writes to waker socket pair to interrupt select.
+        self.dirty: Set[int] = set()
+        self.woken: List[int] = []
+        self.woken_lock = threading.Lock()
+        self.waker: Optional[Tuple[socket.socket, socket.socket]] = None
         self.selector: Optional[selectors.DefaultSelector] = None
-        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def setup_waker(self) -> None:
+        assert self.selector is not None
+        self.waker = socket.socketpair()
+        for sock in self.waker:
+            sock.setblocking(False)
+        self.selector.register(self.waker[0], selectors.EVENT_READ)
+
+    def wake(self, work_id: int) -> None:
+        """Thread-safe, makes event loop re-sync events of work."""
+        assert self.waker is not None
+        with self.woken_lock:
+            self.woken.append(work_id)
+        try:
+            self.waker[1].send(b'\x00')
+        except BlockingIOError:
+            pass    # Loop already has a pending wakeup
+
+    def handle_wakeup(self) -> None:
+        assert self.waker is not None
+        try:
+            while self.waker[0].recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self.woken_lock:
+            woken, self.woken = self.woken, []
+        self.dirty.update(work_id for work_id in woken if work_id in self.works)
+
+    def update_registrations(self) -> None:
+        """Sync selector with events dirty works are interested in.
+
+        Registrations persist across iterations, only changed events
+        result in a register / modify / unregister call."""
+        assert self.selector is not None
+        events = {work_id: self.works[work_id].get_events() for work_id in self.dirty}
+        self.dirty.clear()
+        # Unregister stale descriptors first, their fd may since
+        # have been reused by a descriptor registered below.
+        for work_id in events:
+            registered = self.registered.setdefault(work_id, {})
+            for fd in [fd for fd in registered if fd not in events[work_id]]:
+                self.selector.unregister(fd)
+                del registered[fd]
+                del self.owners[fd]
+        for work_id in events:
+            registered = self.registered[work_id]
+            for fd, mask in events[work_id].items():
+                if fd not in registered:
+                    self.selector.register(fd, mask)
+                    self.owners[fd] = work_id
+                elif registered[fd] != mask:
+                    self.selector.modify(fd, mask)
+                registered[fd] = mask
 
     @contextlib.contextmanager
     def selected_events(self) -> Generator[Tuple[List[Union[int, _HasFileno]],
                                                  List[Union[int, _HasFileno]]],
                                            None, None]:
-        events: Dict[socket.socket, int] = {}
-        for work in self.works.values():
-            events.update(work.get_events())
         assert self.selector is not None
-        for fd in events:
-            self.selector.register(fd, events[fd])
-        ev = self.selector.select(timeout=1)
-        readables = []
-        writables = []
-        for key, mask in ev:
-            if mask & selectors.EVENT_READ:
-                readables.append(key.fileobj)
-            if mask & selectors.EVENT_WRITE:
-                writables.append(key.fileobj)
-        yield (readables, writables)
-        for fd in events.keys():
-            self.selector.unregister(fd)
-
-    async def handle_events(
-            self, fileno: int,
-            readables: List[Union[int, _HasFileno]],
-            writables: List[Union[int, _HasFileno]]) -> bool:
-        return self.works[fileno].handle_events(readables, writables)
-
-    # TODO: Use correct future typing annotations
-    async def wait_for_tasks(
-            self, tasks: Dict[int, Any]) -> None:
-        for work_id in tasks:
-            # TODO: Resolving one handle_events here can block resolution of other tasks
-            try:
-                teardown = await asyncio.wait_for(tasks[work_id], DEFAULT_TIMEOUT)
-                if teardown:
-                    self.cleanup(work_id)
-            except asyncio.TimeoutError:
-                self.cleanup(work_id)
+        self.update_registrations()
+        ev = self.selector.select(timeout=self.select_timeout())
+        # Mask translation and key lookup are already done by selector,
+        # only split ready descriptors into readables and writables here.
+        yield ([key.fileobj for key, mask in ev if mask & selectors.EVENT_READ],
+               [key.fileobj for key, mask in ev if mask & selectors.EVENT_WRITE])
+
+    def select_timeout(self) -> Optional[float]:
+        """Seconds until next due inactivity check or work class housekeeping.
+
+        Also runs work class housekeeping.  Without any work or pending
+        housekeeping there is nothing to check, selector then blocks
+        until Acceptor hands over a client (or a signal arrives)."""
+        timeout = cast(Type[ThreadlessWork], self.work_klass).housekeeping(**self.kwargs)
+        if self.inactivity_checks:
+            check_in = max(0.0, self.inactivity_checks[0][0] - time.monotonic())
+            timeout = check_in if timeout is None else min(timeout, check_in)
+        return timeout
 
     def accept_client(self) -> None:
-        addr = self.client_queue.recv()
-        fileno = recv_handle(self.client_queue)
+        fileno, addr = recv_client(self.client_queue)
         self.works[fileno] = self.work_klass(
             fileno=fileno,
             addr=addr,
             **self.kwargs)
+        self.dirty.add(fileno)
+        self.schedule_inactivity_check(fileno, time.monotonic())
         try:
             self.works[fileno].initialize()
+            self.works[fileno].set_wakeup(functools.partial(self.wake, fileno))
             os.close(fileno)
         except ssl.SSLError as e:
             logger.exception('ssl.SSLError', exc_info=e)
             self.cleanup(fileno)
 
+    def schedule_inactivity_check(self, work_id: int, now: float) -> None:
+        check_at = now + self.INACTIVITY_CHECK_INTERVAL
+        self.next_check[work_id] = check_at
+        heapq.heappush(self.inactivity_checks, (check_at, work_id))
+
     def cleanup_inactive(self) -> None:
-        inactive_works: List[int] = []
-        for work_id in self.works:
+        now = time.monotonic()
+        while self.inactivity_checks and self.inactivity_checks[0][0] <= now:
+            check_at, work_id = heapq.heappop(self.inactivity_checks)
+            if self.next_check.get(work_id) != check_at:
+                continue
             if self.works[work_id].is_inactive():
-                inactive_works.append(work_id)
-        for work_id in inactive_works:
-            self.cleanup(work_id)
+                self.cleanup(work_id)
+            else:
+                self.dirty.add(work_id)
+                self.schedule_inactivity_check(work_id, now)
 
     def cleanup(self, work_id: int) -> None:
+        assert self.selector is not None
+        for fd in self.registered.pop(work_id, {}):
+            self.selector.unregister(fd)
+            del self.owners[fd]
+        self.next_check.pop(work_id, None)
+        self.dirty.discard(work_id)
         # TODO: ProtocolHandler.shutdown can call flush which may block
         self.works[work_id].shutdown()
         del self.works[work_id]
 
     def run_once(self) -> None:
-        assert self.loop is not None
         readables: List[Union[int, _HasFileno]] = []
         writables: List[Union[int, _HasFileno]] = []
         with self.selected_events() as (readables, writables):
@@ -1000,25 +1397,37 @@ class Threadless(multiprocessing.Process):
         # Note that selector from now on is idle,
         # until all the logic below completes.
         #
-        # Invoke Threadless.handle_events
-        # TODO: Only send readable / writables that client originally registered.
-        tasks = {}
-        for fileno in self.works:
-            tasks[fileno] = self.loop.create_task(
-                self.handle_events(fileno, readables, writables))
+        # Invoke ThreadlessWork.handle_events only for works with ready
+        # descriptors, passing each work only descriptors it registered.
+        ready: Dict[int, Tuple[List[Union[int, _HasFileno]], List[Union[int, _HasFileno]]]] = {}
+        for fd in readables:
+            if fd in self.owners:
+                ready.setdefault(self.owners[fd], ([], []))[0].append(fd)
+        for fd in writables:
+            if fd in self.owners:
+                ready.setdefault(self.owners[fd], ([], []))[1].append(fd)
+        teardown = [
+            work_id for work_id, (r, w) in ready.items()
+            if self.works[work_id].handle_events(r, w)]
+        self.dirty.update(ready)
+        for work_id in teardown:
+            self.cleanup(work_id)
+        # Buffers queued from other threads
+        if self.waker is not None and self.waker[0] in readables:
+            self.handle_wakeup()
         # Accepted client connection from Acceptor
         if self.client_queue in readables:
             self.accept_client()
-        # Wait for Threadless.handle_events to complete
-        self.loop.run_until_complete(self.wait_for_tasks(tasks))
         # Remove and shutdown inactive connections
         self.cleanup_inactive()
 
     def run(self) -> None:
+        # Interruptible by join_processes even when started in background
+        signal.signal(signal.SIGINT, signal.default_int_handler)
         try:
             self.selector = selectors.DefaultSelector()
             self.selector.register(self.client_queue, selectors.EVENT_READ)
-            self.loop = asyncio.get_event_loop()
+            self.setup_waker()
             while True:
                 self.run_once()
         except KeyboardInterrupt:
@@ -1027,30 +1436,43 @@ class Threadless(multiprocessing.Process):
             assert self.selector is not None
             self.selector.unregister(self.client_queue)
             self.client_queue.close()
-            assert self.loop is not None
-            self.loop.close()
+            if self.waker is not None:
+                self.selector.unregister(self.waker[0])
+                for sock in self.waker:
+                    sock.close()
 
 
 class Acceptor(multiprocessing.Process):
     """Socket client acceptor.
 
     Accepts client connection over received server socket handle and
-    starts a new work thread.
+    starts a new work thread.  When listen_addr is provided, binds its
+    own SO_REUSEPORT listening socket instead of receiving one, and
+    reports None or the bind error back over work_queue.
     """
 
+    # Only used when acceptors share the server socket received from AcceptorPool
     lock = multiprocessing.Lock()
 
+    # Upper bound on connections accepted per selector wakeup,
+    # keeps one busy listening socket from starving the rest.
+    MAX_ACCEPTS_PER_WAKEUP = 64
+
     def __init__(
             self,
             family: socket.AddressFamily,
             threadless: bool,
-            work_queue: connection.Connection,
+            work_queue: Optional[connection.Connection],
             work_klass: type,
+            listen_addr: Optional[Tuple[str, int]] = None,
+            backlog: int = DEFAULT_BACKLOG,
             **kwargs: Any) -> None:
         super().__init__()
         self.family: socket.AddressFamily = family
         self.threadless: bool = threadless
-        self.work_queue: connection.Connection = work_queue
+        self.work_queue: Optional[connection.Connection] = work_queue
+        self.listen_addr: Optional[Tuple[str, int]] = listen_addr
+        self.backlog: int = backlog
         self.work_klass = work_klass
         self.kwargs = kwargs
 
@@ -1058,12 +1480,12 @@ class Acceptor(multiprocessing.Process):
         self.selector: Optional[selectors.DefaultSelector] = None
         self.sock: Optional[socket.socket] = None
         self.threadless_process: Optional[multiprocessing.Process] = None
-        self.threadless_client_queue: Optional[connection.Connection] = None
+        self.threadless_client_queue: Optional[ClientQueueType] = None
 
     def start_threadless_process(self) -> None:
         if not self.threadless:
             return
-        pipe = multiprocessing.Pipe()
+        pipe = new_client_queue()
         self.threadless_client_queue = pipe[0]
         self.threadless_process = Threadless(
             pipe[1], self.work_klass, **self.kwargs
@@ -1075,27 +1497,40 @@ class Acceptor(multiprocessing.Process):
         if not self.threadless:
             return
         assert self.threadless_process and self.threadless_client_queue
-        self.threadless_process.join()
+        join_processes([self.threadless_process])
         self.threadless_client_queue.close()
 
     def run_once(self) -> None:
         assert self.selector
-        with self.lock:
+        # Threaded works live in this process, selector timeout
+        # below bounds how late their housekeeping runs.
+        if not self.threadless:
+            cast(Type[ThreadlessWork], self.work_klass).housekeeping(**self.kwargs)
+        if self.listen_addr:
+            # Own SO_REUSEPORT socket, kernel already balances across acceptors
             events = self.selector.select(timeout=1)
-            if len(events) == 0:
-                return
-        try:
-            assert self.sock
-            conn, addr = self.sock.accept()
-        except BlockingIOError:
+        else:
+            # Shared server socket, let one acceptor wake up at a time
+            with self.lock:
+                events = self.selector.select(timeout=1)
+        if len(events) == 0:
             return
+        assert self.sock
+        for _ in range(self.MAX_ACCEPTS_PER_WAKEUP):
+            try:
+                conn, addr = self.sock.accept()
+            except BlockingIOError:
+                return
+            self.start_work(conn, addr)
+
+    def start_work(self, conn: socket.socket, addr: Tuple[str, int]) -> None:
         if self.threadless and \
                 self.threadless_client_queue and \
                 self.threadless_process:
-            self.threadless_client_queue.send(addr)
-            send_handle(
+            send_client(
                 self.threadless_client_queue,
                 conn.fileno(),
+                addr,
                 self.threadless_process.pid
             )
             conn.close()
@@ -1111,15 +1546,40 @@ class Acceptor(multiprocessing.Process):
             # work.setDaemon(True)
             work.start()
 
+    def listen(self) -> socket.socket:
+        assert self.listen_addr
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(self.listen_addr)
+        sock.listen(self.backlog)
+        sock.setblocking(False)
+        return sock
+
     def run(self) -> None:
+        # Processes started in background inherit ignored SIGINT,
+        # restore it so join_processes can interrupt this acceptor.
+        signal.signal(signal.SIGINT, signal.default_int_handler)
         self.running = True
         self.selector = selectors.DefaultSelector()
-        fileno = recv_handle(self.work_queue)
-        self.sock = socket.fromfd(
-            fileno,
-            family=self.family,
-            type=socket.SOCK_STREAM
-        )
+        assert self.work_queue
+        if self.listen_addr:
+            try:
+                self.sock = self.listen()
+            except OSError as e:
+                self.work_queue.send(e)
+                self.work_queue.close()
+                return
+            self.work_queue.send(None)
+        else:
+            fileno = recv_handle(self.work_queue)
+            self.sock = socket.fromfd(
+                fileno,
+                family=self.family,
+                type=socket.SOCK_STREAM
+            )
+            # Accept loop relies on BlockingIOError once backlog is drained.
+            self.sock.setblocking(False)
         try:
             self.selector.register(self.sock, selectors.EVENT_READ)
             self.start_threadless_process()
@@ -1131,7 +1591,8 @@ class Acceptor(multiprocessing.Process):
             self.selector.unregister(self.sock)
             self.shutdown_threadless_process()
             self.sock.close()
-            self.work_queue.close()
+            if self.work_queue:
+                self.work_queue.close()
             self.running = False
 
 
@@ -1154,28 +1615,30 @@ class HttpRequestRejected(ProtocolException):
 
     def __init__(self,
                  status_code: Optional[int] = None,
-                 reason: Optional[bytes] = None,
-                 body: Optional[bytes] = None):
+                 reason: Optional[Union[bytes, bytearray]] = None,
+                 body: Optional[Union[bytes, bytearray]] = None):
         self.status_code: Optional[int] = status_code
-        self.reason: Optional[bytes] = reason
-        self.body: Optional[bytes] = body
+        self.reason: Optional[Union[bytes, bytearray]] = reason
+        self.body: Optional[Union[bytes, bytearray]] = body
 
     def response(self, _request: HttpParser) -> Optional[bytes]:
-        pkt = []
+        head = b''
         if self.status_code is not None:
-            line = HTTP_1_1 + WHITESPACE + bytes_(self.status_code)
-            if self.reason:
-                line += WHITESPACE + self.reason
-            pkt.append(line)
-            pkt.append(PROXY_AGENT_HEADER)
+            head = self.build_response_head(
+                self.status_code, bytes(self.reason) if self.reason else None)
         if self.body:
-            pkt.append(b'Content-Length: ' + bytes_(len(self.body)))
-            pkt.append(CRLF)
-            pkt.append(self.body)
-        else:
-            if len(pkt) > 0:
-                pkt.append(CRLF)
-        return CRLF.join(pkt) if len(pkt) > 0 else None
+            return b''.join((head, b'Content-Length: %d\r\n\r\n\r\n' % len(self.body), self.body))
+        return head + CRLF if head else None
+
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def build_response_head(status_code: int, reason: Optional[bytes]) -> bytes:
+        """Cached, plugins usually reject with a handful of distinct status lines.
+
+        Only hashable (status_code, reason) is cached, body is appended per response."""
+        return b'%s%d%s\r\n%s\r\n' % (
+            HTTP_1_1_STATUS_PREFIX, status_code,
+            WHITESPACE + reason if reason else b'', PROXY_AGENT_HEADER)
 
 
 class ProxyConnectionFailed(ProtocolException):
@@ -1218,8 +1681,10 @@ class ProxyAuthenticationFailed(ProtocolException):
         return self.RESPONSE_PKT
 
 
+# Every queue item is a batch of events, one put per batch
+# keeps round trips to the manager process down.
 if TYPE_CHECKING:
-    DevtoolsEventQueueType = queue.Queue[Dict[str, Any]]    # pragma: no cover
+    DevtoolsEventQueueType = queue.Queue[List[Dict[str, Any]]]    # pragma: no cover
 else:
     DevtoolsEventQueueType = queue.Queue
 
@@ -1233,6 +1698,9 @@ class ProtocolConfig:
     ROOT_DATA_DIR_NAME = '.proxy.py'
     GENERATED_CERTS_DIR_NAME = 'certificates'
 
+    # Upper bound on cached TLS contexts for generated certificates
+    MAX_INTERCEPTION_SSL_CONTEXTS = 1024
+
     def __init__(
             self,
             auth_code: Optional[bytes] = DEFAULT_BASIC_AUTH,
@@ -1258,8 +1726,12 @@ class ProtocolConfig:
             devtools_event_queue: Optional[DevtoolsEventQueueType] = None,
             devtools_ws_path: bytes = DEFAULT_DEVTOOLS_WS_PATH,
             timeout: int = DEFAULT_TIMEOUT,
-            threadless: bool = DEFAULT_THREADLESS) -> None:
+            threadless: bool = DEFAULT_THREADLESS,
+            reuse_port: bool = DEFAULT_ENABLE_REUSE_PORT,
+            enable_upstream_keep_alive: bool = DEFAULT_ENABLE_UPSTREAM_KEEP_ALIVE) -> None:
         self.threadless = threadless
+        self.reuse_port = reuse_port
+        self.enable_upstream_keep_alive = enable_upstream_keep_alive
         self.timeout = timeout
         self.auth_code = auth_code
         self.server_recvbuf_size = server_recvbuf_size
@@ -1269,9 +1741,10 @@ class ProtocolConfig:
         if plugins is None:
             plugins = {}
         self.plugins: Dict[bytes, List[type]] = plugins
-        if disable_headers is None:
-            disable_headers = DEFAULT_DISABLE_HEADERS
-        self.disable_headers = disable_headers
+        # Lowercased once here, HttpParser.build checks membership per header.
+        self.disable_headers: FrozenSet[bytes] = DEFAULT_DISABLE_HEADERS \
+            if disable_headers is None else \
+            frozenset(header.lower() for header in disable_headers)
         self.certfile: Optional[str] = certfile
         self.keyfile: Optional[str] = keyfile
         self.ca_key_file: Optional[str] = ca_key_file
@@ -1298,6 +1771,67 @@ class ProtocolConfig:
                 self.proxy_py_data_dir, self.GENERATED_CERTS_DIR_NAME)
             os.makedirs(self.ca_cert_dir, exist_ok=True)
 
+        # TLS contexts are built lazily and then shared by all connections
+        # within a process.  Building one loads CA bundle or certificate
+        # chain from disk, and a shared context lets clients resume sessions.
+        self._encryption_ssl_context: Optional[ssl.SSLContext] = None
+        self._upstream_ssl_context: Optional[ssl.SSLContext] = None
+        self._interception_ssl_contexts: Dict[str, ssl.SSLContext] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # SSLContext can't be pickled, processes started with spawn build their own.
+        state = self.__dict__.copy()
+        state['_encryption_ssl_context'] = None
+        state['_upstream_ssl_context'] = None
+        state['_interception_ssl_contexts'] = {}
+        return state
+
+    def warm_ssl_contexts(self) -> None:
+        """Build TLS contexts ahead of first connection.
+
+        Forked workers inherit them, keeping certificate and CA bundle
+        loading off the first handshake.  Also surfaces invalid
+        certificate files at startup."""
+        if self.encryption_enabled():
+            self.encryption_ssl_context()
+        if self.tls_interception_enabled():
+            self.upstream_ssl_context()
+
+    def encryption_ssl_context(self) -> ssl.SSLContext:
+        """Context for wrapping accepted client connections with --certfile / --keyfile."""
+        if self._encryption_ssl_context is None:
+            assert self.keyfile and self.certfile
+            ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            ctx.options |= ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3 | ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
+            ctx.verify_mode = ssl.CERT_NONE
+            ctx.load_cert_chain(certfile=self.certfile, keyfile=self.keyfile)
+            self._encryption_ssl_context = ctx
+        return self._encryption_ssl_context
+
+    def upstream_ssl_context(self) -> ssl.SSLContext:
+        """Context for verifying upstream servers during TLS interception."""
+        if self._upstream_ssl_context is None:
+            ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+            ctx.options |= ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3 | ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
+            self._upstream_ssl_context = ctx
+        return self._upstream_ssl_context
+
+    def interception_ssl_context(self, certfile: str) -> ssl.SSLContext:
+        """Context for serving intercepted clients with a generated certificate."""
+        ctx = self._interception_ssl_contexts.get(certfile)
+        if ctx is None:
+            ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            ctx.load_cert_chain(certfile=certfile, keyfile=self.ca_signing_key_file)
+            if len(self._interception_ssl_contexts) >= self.MAX_INTERCEPTION_SSL_CONTEXTS:
+                # Evict oldest, insertion ordered
+                self._interception_ssl_contexts.pop(next(iter(self._interception_ssl_contexts)), None)
+            self._interception_ssl_contexts[certfile] = ctx
+        return ctx
+
+    def discard_interception_ssl_context(self, certfile: str) -> None:
+        """Must be called when certfile is rewritten, so that its context gets reloaded."""
+        self._interception_ssl_contexts.pop(certfile, None)
+
     def tls_interception_enabled(self) -> bool:
         return self.ca_key_file is not None and \
             self.ca_cert_dir is not None and \
@@ -1331,6 +1865,26 @@ class ProtocolHandlerPlugin(ABC):
        Add your logic within `on_client_connection_close` for any per connection teardown.
     """
 
+    # Plugins which never own descriptors can set this to False, so that
+    # get_descriptors, write_to_descriptors and read_from_descriptors
+    # are skipped on every event loop iteration.
+    HAS_DESCRIPTORS: bool = True
+    # Plugins whose on_response_chunk returns chunk untouched can set this
+    # to False, so that client buffer isn't copied for every flush when
+    # no plugin needs to see it.
+    HAS_RESPONSE_CHUNK_HOOK: bool = True
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # Flags are inherited, subclasses overriding descriptor methods or
+        # on_response_chunk get them called unless they explicitly opt out again.
+        if 'HAS_DESCRIPTORS' not in cls.__dict__ and any(
+                name in cls.__dict__ for name in
+                ('get_descriptors', 'write_to_descriptors', 'read_from_descriptors')):
+            cls.HAS_DESCRIPTORS = True
+        if 'HAS_RESPONSE_CHUNK_HOOK' not in cls.__dict__ and 'on_response_chunk' in cls.__dict__:
+            cls.HAS_RESPONSE_CHUNK_HOOK = True
+
     def __init__(
             self,
             config: ProtocolConfig,
@@ -1348,6 +1902,11 @@ class ProtocolHandlerPlugin(ABC):
         access a specific plugin by its name."""
         return self.__class__.__name__
 
+    @classmethod
+    def housekeeping(cls, config: ProtocolConfig) -> Optional[float]:
+        """Periodic plugin wide maintenance, see ThreadlessWork.housekeeping."""
+        return None
+
     @abstractmethod
     def get_descriptors(
             self) -> Tuple[List[socket.socket], List[socket.socket]]:
@@ -1449,9 +2008,27 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
         reason=b'Connection established'
     )
 
+    HAS_RESPONSE_CHUNK_HOOK = False
+
+    # Request headers dropped, and Via header added, before forwarding upstream
+    DROP_REQUEST_HEADERS = [b'proxy-authorization', b'proxy-connection']
+    VIA_HEADER = (b'Via', b'1.1 ' + PROXY_AGENT_HEADER_VALUE)
+
     # Used to synchronize with other HttpProxyPlugin instances while
-    # generating certificates
-    lock = threading.Lock()
+    # generating certificates.  Fixed set of locks striped by certificate
+    # path, so that different hosts mostly generate concurrently.
+    CERT_LOCK_STRIPES = 64
+    cert_locks: List[threading.Lock] = [threading.Lock() for _ in range(CERT_LOCK_STRIPES)]
+
+    # Idle keep-alive upstream connections, oldest first, as (parked at, connection).
+    # With --enable-upstream-keep-alive, parked when a client connection closes
+    # after a complete exchange, and handed to next client request for same
+    # upstream within the timeout.  Shared by all connections of a process,
+    # Acceptor and Threadless loops reap expired ones.
+    MAX_IDLE_UPSTREAM_CONNECTIONS = 64
+    IDLE_UPSTREAM_TIMEOUT = 5.0
+    idle_upstream_lock = threading.Lock()
+    idle_upstream_connections: List[Tuple[float, TcpServerConnection]] = []
 
     def __init__(
             self,
@@ -1464,12 +2041,17 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
         self.response: HttpParser = HttpParser(httpParserTypes.RESPONSE_PARSER)
         self.pipeline_request: Optional[HttpParser] = None
         self.pipeline_response: Optional[HttpParser] = None
+        # Requests dispatched to upstream server
+        self.upstream_requests: int = 0
 
         self.plugins: Dict[str, HttpProxyBasePlugin] = {}
         if b'HttpProxyBasePlugin' in self.config.plugins:
             for klass in self.config.plugins[b'HttpProxyBasePlugin']:
                 instance = klass(self.config, self.client)
                 self.plugins[instance.name()] = instance
+        # Plugins are fixed for lifetime of the connection, bind per chunk hooks once
+        self.upstream_chunk_handlers: Tuple[Callable[[bytes], bytes], ...] = tuple(
+            plugin.handle_upstream_chunk for plugin in self.plugins.values())
 
     def get_descriptors(
             self) -> Tuple[List[socket.socket], List[socket.socket]]:
@@ -1508,6 +2090,9 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
             logger.debug('Server is ready for reads, reading...')
             raw: Optional[bytes] = None
 
+            if self.can_splice_upstream():
+                return self.splice_upstream()
+
             try:
                 raw = self.server.recv(self.config.server_recvbuf_size)
             except ssl.SSLWantReadError:    # Try again later
@@ -1526,8 +2111,8 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
                 logger.debug('Server closed connection, tearing down...')
                 return True
 
-            for plugin in self.plugins.values():
-                raw = plugin.handle_upstream_chunk(raw)
+            for handle_upstream_chunk in self.upstream_chunk_handlers:
+                raw = handle_upstream_chunk(raw)
 
             # parse incoming response packet
             # only for non-https requests and when
@@ -1542,7 +2127,8 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
                         self.pipeline_response = HttpParser(httpParserTypes.RESPONSE_PARSER)
                     self.pipeline_response.parse(raw)
                     if self.pipeline_response.state == httpParserStates.COMPLETE:
-                        self.pipeline_response = None
+                        # Reuse same parser for next pipelined response
+                        self.pipeline_response.reset()
                 else:
                     self.response.parse(raw)
             else:
@@ -1551,31 +2137,62 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
             self.client.queue(raw)
         return False
 
+    def can_splice_upstream(self) -> bool:
+        """Data received over a CONNECT tunnel can be moved to client within kernel,
+        unless some plugin needs to see it or TLS interception is enabled."""
+        assert self.server
+        return self.request.method == httpMethods.CONNECT and \
+            not self.config.tls_interception_enabled() and \
+            not self.upstream_chunk_handlers and \
+            not self.config.devtools_event_queue and \
+            self.server.can_splice_to(self.client)
+
+    def splice_upstream(self) -> bool:
+        assert self.server
+        try:
+            spliced = self.server.splice_to(self.client, self.config.server_recvbuf_size)
+        except BlockingIOError:
+            return False
+        except OSError as e:
+            if e.errno == errno.ECONNRESET:
+                logger.warning('Connection reset by upstream: %r', e)
+            else:
+                logger.exception(
+                    'Exception while splicing from %s connection %r with reason %r',
+                    self.server.tag, self.server.connection, e)
+            return True
+        if spliced is None:
+            logger.debug('Server closed connection, tearing down...')
+            return True
+        self.response.total_size += spliced
+        return False
+
     def access_log(self) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
         server_host, server_port = self.server.addr if self.server else (
             None, None)
         connection_time_ms = (time.time() - self.start_time) * 1000
-        if self.request.method == b'CONNECT':
+        if self.request.method == httpMethods.CONNECT:
             logger.info(
-                '%s:%s - %s %s:%s - %s bytes - %.2f ms' %
-                (self.client.addr[0],
-                 self.client.addr[1],
-                 text_(self.request.method),
-                 text_(server_host),
-                 text_(server_port),
-                 self.response.total_size,
-                 connection_time_ms))
+                '%s:%s - CONNECT %s:%s - %s bytes - %.2f ms',
+                self.client.addr[0],
+                self.client.addr[1],
+                text_(server_host),
+                text_(server_port),
+                self.response.total_size,
+                connection_time_ms)
         elif self.request.method:
             logger.info(
-                '%s:%s - %s %s:%s%s - %s %s - %s bytes - %.2f ms' %
-                (self.client.addr[0], self.client.addr[1],
-                 text_(self.request.method),
-                 text_(server_host), server_port,
-                 text_(self.request.path),
-                 text_(self.response.code),
-                 text_(self.response.reason),
-                 self.response.total_size,
-                 connection_time_ms))
+                '%s:%s - %s %s:%s%s - %s %s - %s bytes - %.2f ms',
+                self.client.addr[0], self.client.addr[1],
+                text_(self.request.method),
+                text_(server_host), server_port,
+                text_(self.request.path),
+                text_(self.response.code),
+                text_(self.response.reason),
+                self.response.total_size,
+                connection_time_ms)
 
     def on_client_connection_close(self) -> None:
         if not self.request.has_upstream_server():
@@ -1593,6 +2210,10 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
         for plugin in self.plugins.values():
             plugin.on_upstream_connection_close()
 
+        if self.release_upstream():
+            logger.debug('Parked upstream connection %s:%s for reuse', *self.server.addr)
+            return
+
         try:
             try:
                 self.server.connection.shutdown(socket.SHUT_WR)
@@ -1600,12 +2221,13 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
                 pass
             finally:
                 # TODO: Unwrap if wrapped before close?
-                self.server.connection.close()
+                # Also closes pipe used by splice_to, if any.
+                self.server.close()
         except TcpConnectionUninitializedException:
             pass
         finally:
             logger.debug(
-                'Closed server connection with pending server buffer size %d bytes' %
+                'Closed server connection with pending server buffer size %d bytes',
                 self.server.buffer_size())
 
     def on_response_chunk(self, chunk: bytes) -> bytes:
@@ -1639,6 +2261,7 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
                         self.pipeline_request = r
                     assert self.pipeline_request is not None
                     self.server.queue(self.pipeline_request.build())
+                    self.upstream_requests += 1
                     self.pipeline_request = None
             else:
                 self.server.queue(raw)
@@ -1658,35 +2281,44 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
                 f'--ca-cert-file:{ self.config.ca_cert_file }, '
                 f'--ca-key-file:{ self.config.ca_key_file }, '
                 f'--ca-signing-key-file:{ self.config.ca_signing_key_file }')
+        host_str = text_(self.request.host)
         cert_file_path = HttpProxyPlugin.generated_cert_file_path(
-            self.config.ca_cert_dir, text_(self.request.host))
-        with self.lock:
+            self.config.ca_cert_dir, host_str)
+        # Certificates are only ever published complete, see below
+        if os.path.isfile(cert_file_path):
+            return cert_file_path
+        with self.cert_locks[hash(cert_file_path) % self.CERT_LOCK_STRIPES]:
             if not os.path.isfile(cert_file_path):
                 logger.debug('Generating certificates %s', cert_file_path)
+                tmp_file_path = '%s.%d.tmp' % (cert_file_path, os.getpid())
                 # TODO: Parse subject from certificate
                 # Currently we only set CN= field for generated certificates.
                 gen_cert = subprocess.Popen(
                     ['openssl', 'req', '-new', '-key', self.config.ca_signing_key_file, '-subj',
-                     f'/C=/ST=/L=/O=/OU=/CN={ text_(self.request.host) }'],
+                     f'/C=/ST=/L=/O=/OU=/CN={ host_str }'],
                     stdout=subprocess.PIPE,
                     stderr=subprocess.PIPE)
                 sign_cert = subprocess.Popen(
                     ['openssl', 'x509', '-req', '-days', '365', '-CA', self.config.ca_cert_file, '-CAkey',
-                     self.config.ca_key_file, '-set_serial', str(int(time.time())), '-out', cert_file_path],
+                     self.config.ca_key_file, '-set_serial', str(int(time.time())), '-out', tmp_file_path],
                     stdin=gen_cert.stdout,
                     stderr=subprocess.PIPE)
-                # TODO: Ensure sign_cert success.
-                sign_cert.communicate(timeout=10)
+                try:
+                    sign_cert.communicate(timeout=10)
+                    if sign_cert.returncode == 0:
+                        os.replace(tmp_file_path, cert_file_path)
+                        self.config.discard_interception_ssl_context(cert_file_path)
+                finally:
+                    # Partial output of a failed or timed out signing
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(tmp_file_path)
         return cert_file_path
 
     def wrap_server(self) -> None:
         assert self.server is not None
         assert isinstance(self.server.connection, socket.socket)
-        ctx = ssl.create_default_context(
-            ssl.Purpose.SERVER_AUTH)
-        ctx.options |= ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3 | ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
         self.server.connection.setblocking(True)
-        self.server._conn = ctx.wrap_socket(
+        self.server._conn = self.config.upstream_ssl_context().wrap_socket(
             self.server.connection,
             server_hostname=text_(self.request.host))
         self.server.connection.setblocking(False)
@@ -1698,11 +2330,9 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
             cast(Dict[str, Any], self.server.connection.getpeercert()))
         self.client.connection.setblocking(True)
         self.client.flush()
-        self.client._conn = ssl.wrap_socket(
+        self.client._conn = self.config.interception_ssl_context(generated_cert).wrap_socket(
             self.client.connection,
-            server_side=True,
-            keyfile=self.config.ca_signing_key_file,
-            certfile=generated_cert)
+            server_side=True)
         self.client.connection.setblocking(False)
         logger.debug(
             'TLS interception using %s', generated_cert)
@@ -1761,8 +2391,7 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
             # - proxy-connection header is a mistake, it doesn't seem to be
             #   officially documented in any specification, drop it.
             # - proxy-authorization is of no use for upstream, remove it.
-            self.request.del_headers(
-                [b'proxy-authorization', b'proxy-connection'])
+            self.request.del_headers(HttpProxyPlugin.DROP_REQUEST_HEADERS)
             # - For HTTP/1.0, connection header defaults to close
             # - For HTTP/1.1, connection header defaults to keep-alive
             # Respect headers sent by client instead of manipulating
@@ -1770,11 +2399,12 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
             # https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Connection
             # connection headers are meant for communication between client and
             # first intercepting proxy.
-            self.request.add_headers([(b'Via', b'1.1 %s' % PROXY_AGENT_HEADER_VALUE)])
+            self.request.add_header(*HttpProxyPlugin.VIA_HEADER)
             # Disable args.disable_headers before dispatching to upstream
             self.server.queue(
                 self.request.build(
                     disable_headers=self.config.disable_headers))
+            self.upstream_requests += 1
         return False
 
     def authenticate(self) -> None:
@@ -1783,22 +2413,104 @@ class HttpProxyPlugin(ProtocolHandlerPlugin):
                     self.request.headers[b'proxy-authorization'][1] != self.config.auth_code:
                 raise ProxyAuthenticationFailed()
 
+    def release_upstream(self) -> bool:
+        """Parks upstream connection for reuse, if it is left between keep-alive exchanges.
+
+        Only a single request with an explicitly framed response, both of which
+        were completely exchanged, qualifies.  Returns False when connection
+        must be closed instead."""
+        assert self.server is not None
+        if not self.config.enable_upstream_keep_alive or \
+                self.request.method == httpMethods.CONNECT or \
+                self.upstream_requests != 1 or \
+                self.pipeline_request is not None or \
+                self.pipeline_response is not None or \
+                self.server.closed or self.server.has_buffer() or \
+                self.request.state != httpParserStates.COMPLETE or \
+                self.response.state != httpParserStates.COMPLETE or \
+                self.response.buffer or \
+                not (self.response.has_header(b'content-length') or self.response.is_chunked_encoded()) or \
+                not self.request.is_http_1_1_keep_alive() or \
+                not self.response.is_http_1_1_keep_alive():
+            return False
+        now = time.monotonic()
+        expired: List[TcpServerConnection] = []
+        with self.idle_upstream_lock:
+            idle = self.idle_upstream_connections
+            while idle and (len(idle) >= self.MAX_IDLE_UPSTREAM_CONNECTIONS or
+                            now - idle[0][0] >= self.IDLE_UPSTREAM_TIMEOUT):
+                expired.append(idle.pop(0)[1])
+            idle.append((now, self.server))
+        for server in expired:
+            server.close()
+        return True
+
+    @classmethod
+    def housekeeping(cls, config: ProtocolConfig) -> Optional[float]:
+        if not config.enable_upstream_keep_alive:
+            return None
+        return cls.reap_idle_upstream_connections()
+
+    @classmethod
+    def reap_idle_upstream_connections(cls) -> Optional[float]:
+        """Closes expired parked connections.
+
+        Returns seconds until next parked connection expires, None if none is parked."""
+        now = time.monotonic()
+        expired: List[TcpServerConnection] = []
+        with cls.idle_upstream_lock:
+            idle = cls.idle_upstream_connections
+            while idle and now - idle[0][0] >= cls.IDLE_UPSTREAM_TIMEOUT:
+                expired.append(idle.pop(0)[1])
+            expires_in = idle[0][0] + cls.IDLE_UPSTREAM_TIMEOUT - now if idle else None
+        for server in expired:
+            server.close()
+        return expires_in
+
+    @classmethod
+    def acquire_upstream(cls, addr: Tuple[str, int]) -> Optional[TcpServerConnection]:
+        """Returns most recently parked connection to addr which is still open."""
+        now = time.monotonic()
+        while True:
+            with cls.idle_upstream_lock:
+                idle = cls.idle_upstream_connections
+                for i in range(len(idle) - 1, -1, -1):
+                    if idle[i][1].addr == addr:
+                        parked_at, server = idle.pop(i)
+                        break
+                else:
+                    return None
+            try:
+                # Parked connections must have nothing to read,
+                # otherwise server has closed it or sent unsolicited data.
+                if now - parked_at < cls.IDLE_UPSTREAM_TIMEOUT:
+                    server.connection.recv(1, socket.MSG_PEEK)
+            except BlockingIOError:
+                return server
+            except OSError:
+                pass
+            server.close()
+
     def connect_upstream(self) -> None:
         host, port = self.request.host, self.request.port
         if host and port:
-            self.server = TcpServerConnection(text_(host), port)
+            # Decode once, host is used as text for pool lookup, connection and logs
+            host_str = text_(host)
+            if self.config.enable_upstream_keep_alive and \
+                    self.request.method != httpMethods.CONNECT:
+                self.server = self.acquire_upstream((host_str, port))
+                if self.server is not None:
+                    logger.debug('Reusing upstream connection %s:%s', host_str, port)
+                    return
+            self.server = TcpServerConnection(host_str, port)
             try:
-                logger.debug(
-                    'Connecting to upstream %s:%s' %
-                    (text_(host), port))
+                logger.debug('Connecting to upstream %s:%s', host_str, port)
                 self.server.connect()
                 self.server.connection.setblocking(False)
-                logger.debug(
-                    'Connected to upstream %s:%s' %
-                    (text_(host), port))
+                logger.debug('Connected to upstream %s:%s', host_str, port)
             except Exception as e:  # TimeoutError, socket.gaierror
                 self.server.closed = True
-                raise ProxyConnectionFailed(text_(host), port, repr(e)) from e
+                raise ProxyConnectionFailed(host_str, port, repr(e)) from e
         else:
             logger.exception('Both host and port must exist')
             raise ProtocolException()
@@ -1809,6 +2521,11 @@ class WebsocketFrame:
 
     GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
 
+    # Frame header, followed by 16 or 64 bit extended payload length when needed
+    HEADER = struct.Struct('!BB')
+    HEADER_16 = struct.Struct('!BBH')
+    HEADER_64 = struct.Struct('!BBQ')
+
     def __init__(self) -> None:
         self.fin: bool = False
         self.rsv1: bool = False
@@ -1845,93 +2562,109 @@ class WebsocketFrame:
     def build(self) -> bytes:
         if self.payload_length is None and self.data:
             self.payload_length = len(self.data)
-        raw = io.BytesIO()
-        raw.write(
-            struct.pack(
-                '!B',
-                (1 << 7 if self.fin else 0) |
-                (1 << 6 if self.rsv1 else 0) |
-                (1 << 5 if self.rsv2 else 0) |
-                (1 << 4 if self.rsv3 else 0) |
-                self.opcode
-            ))
+        b1 = (1 << 7 if self.fin else 0) | \
+            (1 << 6 if self.rsv1 else 0) | \
+            (1 << 5 if self.rsv2 else 0) | \
+            (1 << 4 if self.rsv3 else 0) | \
+            self.opcode
+        b2 = 1 << 7 if self.masked else 0
         assert self.payload_length is not None
         if self.payload_length < 126:
-            raw.write(
-                struct.pack(
-                    '!B',
-                    (1 << 7 if self.masked else 0) | self.payload_length
-                )
-            )
+            header = self.HEADER.pack(b1, b2 | self.payload_length)
         elif self.payload_length < 1 << 16:
-            raw.write(
-                struct.pack(
-                    '!BH',
-                    (1 << 7 if self.masked else 0) | 126,
-                    self.payload_length
-                )
-            )
+            header = self.HEADER_16.pack(b1, b2 | 126, self.payload_length)
         elif self.payload_length < 1 << 64:
-            raw.write(
-                struct.pack(
-                    '!BHQ',
-                    (1 << 7 if self.masked else 0) | 127,
-                    self.payload_length
-                )
-            )
+            header = self.HEADER_64.pack(b1, b2 | 127, self.payload_length)
         else:
             raise ValueError(f'Invalid payload_length { self.payload_length },'
                              f'maximum allowed { 1 << 64 }')
         if self.masked and self.data:
             mask = secrets.token_bytes(4) if self.mask is None else self.mask
-            raw.write(mask)
-            raw.write(self.apply_mask(self.data, mask))
+            return b''.join((header, mask, self.apply_mask(self.data, mask)))
         elif self.data:
-            raw.write(self.data)
-        return raw.getvalue()
+            return header + self.data
+        return header
 
     def parse(self, raw: bytes) -> bytes:
-        cur = 0
+        return raw[self.parse_at(raw):]
+
+    @classmethod
+    def frame_length(cls, raw: bytes, start: int = 0) -> Optional[int]:
+        """Returns length of frame starting at offset start of raw.
+
+        None when raw doesn't hold enough of the header to tell yet."""
+        available = len(raw) - start
+        if available < cls.HEADER.size:
+            return None
+        length = raw[start + 1] & 0b01111111
+        header = cls.HEADER.size
+        if length == 126:
+            if available < cls.HEADER_16.size:
+                return None
+            length = cls.HEADER_16.unpack_from(raw, start)[2]
+            header = cls.HEADER_16.size
+        elif length == 127:
+            if available < cls.HEADER_64.size:
+                return None
+            length = cls.HEADER_64.unpack_from(raw, start)[2]
+            header = cls.HEADER_64.size
+        if raw[start + 1] & 0b10000000:
+            header += 4
+        return header + length
+
+    def parse_at(self, raw: bytes, start: int = 0) -> int:
+        """Parses frame starting at offset start of raw.
+
+        Returns offset of the first byte past parsed frame, letting callers walk
+        multiple frames in raw without copying the remainder for every frame."""
+        cur = start
         self.parse_fin_and_rsv(raw[cur])
         cur += 1
 
         self.parse_mask_and_payload(raw[cur])
         cur += 1
 
+        # Unpack extended payload length in place, without slicing it out of raw
         if self.payload_length == 126:
-            data = raw[cur: cur + 2]
-            self.payload_length, = struct.unpack('!H', data)
+            self.payload_length = self.HEADER_16.unpack_from(raw, start)[2]
             cur += 2
         elif self.payload_length == 127:
-            data = raw[cur: cur + 8]
-            self.payload_length, = struct.unpack('!Q', data)
+            self.payload_length = self.HEADER_64.unpack_from(raw, start)[2]
             cur += 8
 
         if self.masked:
             self.mask = raw[cur: cur + 4]
             cur += 4
 
-        assert self.payload_length
+        assert self.payload_length is not None
         self.data = raw[cur: cur + self.payload_length]
         cur += self.payload_length
-        if self.masked:
+        if self.masked and self.payload_length > 0:
             assert self.mask is not None
             self.data = self.apply_mask(self.data, self.mask)
 
-        return raw[cur:]
+        return cur
 
     @staticmethod
     def apply_mask(data: bytes, mask: bytes) -> bytes:
-        raw = bytearray(data)
-        for i in range(len(raw)):
-            raw[i] = raw[i] ^ mask[i % 4]
-        return bytes(raw)
+        if mask[0] == mask[1] == mask[2] == mask[3]:
+            # Single byte key (e.g. all zero mask), a table lookup per byte is cheaper still
+            return data.translate(WebsocketFrame.xor_table(mask[0]))
+        # XOR whole payload against repeated mask as two big integers,
+        # letting int.__xor__ walk the buffer in C instead of per byte in Python.
+        length = len(data)
+        key = (mask * ((length + 3) // 4))[:length]
+        return (int.from_bytes(data, 'little') ^ int.from_bytes(key, 'little')).to_bytes(length, 'little')
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def xor_table(key: int) -> bytes:
+        return bytes(i ^ key for i in range(256))
 
     @staticmethod
     def key_to_accept(key: bytes) -> bytes:
-        sha1 = hashlib.sha1()
-        sha1.update(key + WebsocketFrame.GUID)
-        return base64.b64encode(sha1.digest())
+        # hashlib.sha1 is backed by OpenSSL which picks SHA extensions when CPU has them.
+        return base64.b64encode(hashlib.sha1(key + WebsocketFrame.GUID).digest())
 
 
 class WebsocketClient(TcpConnection):
@@ -1950,6 +2683,10 @@ class WebsocketClient(TcpConnection):
         self.upgrade()
         self.sock.setblocking(False)
         self.selector: selectors.DefaultSelector = selectors.DefaultSelector()
+        # Events sock is currently registered for, None until first run_once.
+        self.events: Optional[int] = None
+        # Trailing partial frame of last read, completed by following reads.
+        self.pending: bytes = b''
 
     @property
     def connection(self) -> Union[ssl.SSLSocket, socket.socket]:
@@ -1961,7 +2698,7 @@ class WebsocketClient(TcpConnection):
         response = HttpParser(httpParserTypes.RESPONSE_PARSER)
         response.parse(self.sock.recv(DEFAULT_BUFFER_SIZE))
         accept = response.header(b'Sec-Websocket-Accept')
-        assert WebsocketFrame.key_to_accept(key) == accept
+        assert hmac.compare_digest(WebsocketFrame.key_to_accept(key), accept)
 
     def ping(self, data: Optional[bytes] = None) -> None:
         pass
@@ -1977,9 +2714,12 @@ class WebsocketClient(TcpConnection):
         ev = selectors.EVENT_READ
         if self.has_buffer():
             ev |= selectors.EVENT_WRITE
-        self.selector.register(self.sock.fileno(), ev)
+        if self.events is None:
+            self.selector.register(self.sock, ev)
+        elif self.events != ev:
+            self.selector.modify(self.sock, ev)
+        self.events = ev
         events = self.selector.select(timeout=1)
-        self.selector.unregister(self.sock)
         for key, mask in events:
             if mask & selectors.EVENT_READ and self.on_message:
                 raw = self.recv()
@@ -1987,9 +2727,17 @@ class WebsocketClient(TcpConnection):
                     self.closed = True
                     logger.debug('Websocket connection closed by server')
                     return True
-                frame = WebsocketFrame()
-                frame.parse(raw)
-                self.on_message(frame)
+                if self.pending:
+                    raw = self.pending + raw
+                cur, end = 0, len(raw)
+                while cur < end:
+                    length = WebsocketFrame.frame_length(raw, cur)
+                    if length is None or cur + length > end:
+                        break
+                    frame = WebsocketFrame()
+                    cur = frame.parse_at(raw, cur)
+                    self.on_message(frame)
+                self.pending = raw[cur:]
             elif mask & selectors.EVENT_WRITE:
                 logger.debug(self.buffer)
                 self.flush()
@@ -2006,7 +2754,9 @@ class WebsocketClient(TcpConnection):
             pass
         finally:
             try:
-                self.selector.unregister(self.sock)
+                if self.events is not None:
+                    self.selector.unregister(self.sock)
+                    self.events = None
                 self.sock.shutdown(socket.SHUT_WR)
             except Exception as e:
                 logging.exception('Exception while shutdown of websocket client', exc_info=e)
@@ -2058,6 +2808,34 @@ class DevtoolsWebsocketPlugin(HttpWebServerBasePlugin):
 
     Dispatcher thread is terminated when Devtools Frontend disconnects."""
 
+    # Serialized results for methods answered with a fixed response,
+    # all other methods get an empty result.
+    RESULTS: Dict[str, bytes] = {
+        method: bytes_(json.dumps(result)) for method, result in (
+            ('Page.canScreencast', False),
+            ('Network.canEmulateNetworkConditions', False),
+            ('Emulation.canEmulate', False),
+            ('Page.getResourceTree', {
+                'frameTree': {
+                    'frame': {
+                        'id': 1,
+                        'url': 'http://proxypy',
+                        'mimeType': 'other',
+                    },
+                    'childFrames': [],
+                    'resources': []
+                }
+            }),
+            ('Network.getResponseBody', {
+                'body': '',
+                'base64Encoded': False,
+            }),
+        )
+    }
+
+    # Maximum number of queued events sent to client in a single write.
+    MAX_DISPATCH_BATCH_SIZE = 64
+
     def __init__(
             self,
             config: ProtocolConfig,
@@ -2091,13 +2869,25 @@ class DevtoolsWebsocketPlugin(HttpWebServerBasePlugin):
             client: TcpClientConnection) -> None:
         while not shutdown.is_set():
             try:
-                ev = devtools_event_queue.get(timeout=1)
-                frame = WebsocketFrame()
-                frame.fin = True
-                frame.opcode = websocketOpcodes.TEXT_FRAME
-                frame.data = bytes_(json.dumps(ev))
-                logger.debug(ev)
-                client.queue(frame.build())
+                evs = devtools_event_queue.get(timeout=1)
+                # Drain events queued meanwhile, so that bursts
+                # are sent to client as a single buffer.
+                try:
+                    while len(evs) < DevtoolsWebsocketPlugin.MAX_DISPATCH_BATCH_SIZE:
+                        evs += devtools_event_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                frames = []
+                for ev in evs:
+                    frame = WebsocketFrame()
+                    frame.fin = True
+                    frame.opcode = websocketOpcodes.TEXT_FRAME
+                    frame.data = bytes_(json.dumps(ev))
+                    logger.debug(ev)
+                    frames.append(frame.build())
+                client.queue(b''.join(frames))
+                if client.wakeup is not None:
+                    client.wakeup()
             except queue.Empty:
                 pass
             except Exception as e:
@@ -2128,50 +2918,14 @@ class DevtoolsWebsocketPlugin(HttpWebServerBasePlugin):
         self.stop_dispatcher()
 
     def handle_message(self, message: Dict[str, Any]) -> None:
+        if message['method'] == 'Network.getResponseBody':
+            logger.debug('received request method Network.getResponseBody')
         frame = WebsocketFrame()
         frame.fin = True
         frame.opcode = websocketOpcodes.TEXT_FRAME
-
-        if message['method'] in (
-            'Page.canScreencast',
-            'Network.canEmulateNetworkConditions',
-            'Emulation.canEmulate'
-        ):
-            data = json.dumps({
-                'id': message['id'],
-                'result': False
-            })
-        elif message['method'] == 'Page.getResourceTree':
-            data = json.dumps({
-                'id': message['id'],
-                'result': {
-                    'frameTree': {
-                        'frame': {
-                            'id': 1,
-                            'url': 'http://proxypy',
-                            'mimeType': 'other',
-                        },
-                        'childFrames': [],
-                        'resources': []
-                    }
-                }
-            })
-        elif message['method'] == 'Network.getResponseBody':
-            logger.debug('received request method Network.getResponseBody')
-            data = json.dumps({
-                'id': message['id'],
-                'result': {
-                    'body': '',
-                    'base64Encoded': False,
-                }
-            })
-        else:
-            data = json.dumps({
-                'id': message['id'],
-                'result': {},
-            })
-
-        frame.data = bytes_(data)
+        frame.data = b'{"id": %s, "result": %s}' % (
+            bytes_(json.dumps(message['id'])),
+            self.RESULTS.get(message['method'], b'{}'))
         self.client.queue(frame.build())
 
 
@@ -2237,6 +2991,18 @@ class HttpWebServerPlugin(ProtocolHandlerPlugin):
                  b'Connection': b'close'}
     )
 
+    # Static file responses by file path, as (mtime_ns, size, response).
+    # Shared by all connections of a worker process, bounded by total response
+    # bytes held.  Files larger than size limit are not cached.
+    MAX_STATIC_RESPONSES_SIZE = 8 * 1024 * 1024
+    MAX_STATIC_RESPONSE_FILE_SIZE = 256 * 1024
+    static_responses: Dict[str, Tuple[int, int, bytes]] = {}
+    static_responses_size: int = 0
+    static_responses_lock = threading.Lock()
+
+    HAS_DESCRIPTORS = False
+    HAS_RESPONSE_CHUNK_HOOK = False
+
     def __init__(
             self,
             config: ProtocolConfig,
@@ -2252,6 +3018,8 @@ class HttpWebServerPlugin(ProtocolHandlerPlugin):
             httpProtocolTypes.WEBSOCKET: {},
         }
         self.route: Optional[HttpWebServerBasePlugin] = None
+        # Parser reused for every frame received on an upgraded connection
+        self.websocket_frame: WebsocketFrame = WebsocketFrame()
 
         if b'HttpWebServerBasePlugin' in self.config.plugins:
             for klass in self.config.plugins[b'HttpWebServerBasePlugin']:
@@ -2264,25 +3032,56 @@ class HttpWebServerPlugin(ProtocolHandlerPlugin):
 
         Queues 404 Not Found for IOError.
         Shouldn't this be server error?
+
+        Responses are cached and served as long as file modification
+        time and size still match, at the cost of a single stat.
         """
         try:
+            st = os.stat(path)
+            cached = self.static_responses.get(path)
+            if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                self.client.queue(cached[2])
+                return False
             with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
                 content = f.read()
             content_type = mimetypes.guess_type(path)[0]
             if content_type is None:
                 content_type = 'text/plain'
-            self.client.queue(build_http_response(
+            response = build_http_response(
                 httpStatusCodes.OK,
                 reason=b'OK',
                 headers={
                     b'Content-Type': bytes_(content_type),
                 },
-                body=content))
+                body=content)
+            self.cache_static_response(
+                path, st, response, len(content) <= self.MAX_STATIC_RESPONSE_FILE_SIZE)
+            self.client.queue(response)
             return False
         except IOError:
             self.client.queue(self.DEFAULT_404_RESPONSE)
         return True
 
+    @staticmethod
+    def cache_static_response(path: str, st: os.stat_result, response: bytes, cacheable: bool) -> None:
+        """Replaces cached response of path, evicting oldest responses beyond size limit."""
+        # Not cls of a classmethod, subclasses must account into the same cache
+        cls = HttpWebServerPlugin
+        with cls.static_responses_lock:
+            stale = cls.static_responses.pop(path, None)
+            if stale is not None:
+                cls.static_responses_size -= len(stale[2])
+            if not cacheable:
+                return
+            while cls.static_responses and \
+                    cls.static_responses_size + len(response) > cls.MAX_STATIC_RESPONSES_SIZE:
+                # Evict oldest, insertion ordered
+                evicted = cls.static_responses.pop(next(iter(cls.static_responses)))
+                cls.static_responses_size -= len(evicted[2])
+            cls.static_responses[path] = (st.st_mtime_ns, st.st_size, response)
+            cls.static_responses_size += len(response)
+
     def try_upgrade(self) -> bool:
         if self.request.has_header(b'connection') and \
                 self.request.header(b'connection').lower() == b'upgrade':
@@ -2302,9 +3101,11 @@ class HttpWebServerPlugin(ProtocolHandlerPlugin):
         if self.request.has_upstream_server():
             return False
 
+        assert self.request.path is not None
         # If a websocket route exists for the path, try upgrade
-        if self.request.path in self.routes[httpProtocolTypes.WEBSOCKET]:
-            self.route = self.routes[httpProtocolTypes.WEBSOCKET][self.request.path]
+        route = self.routes[httpProtocolTypes.WEBSOCKET].get(self.request.path)
+        if route is not None:
+            self.route = route
 
             # Connection upgrade
             teardown = self.try_upgrade()
@@ -2321,17 +3122,17 @@ class HttpWebServerPlugin(ProtocolHandlerPlugin):
         protocol = httpProtocolTypes.HTTPS \
             if self.config.encryption_enabled() else \
             httpProtocolTypes.HTTP
-        for r in self.routes[protocol]:
-            if r == self.request.path:
-                self.route = self.routes[protocol][r]
-                self.route.handle_request(self.request)
-                return False
+        route = self.routes[protocol].get(self.request.path)
+        if route is not None:
+            self.route = route
+            self.route.handle_request(self.request)
+            return False
 
         # No-route found, try static serving if enabled
         if self.config.enable_static_server:
             path = text_(self.request.path).split('?')[0]
-            if os.path.isfile(self.config.static_server_dir + path):
-                return self.serve_file_or_404(self.config.static_server_dir + path)
+            # Queues same 404 as below when path is not a readable file
+            return self.serve_file_or_404(self.config.static_server_dir + path)
 
         # Catch all unhandled web server requests, return 404
         self.client.queue(self.DEFAULT_404_RESPONSE)
@@ -2345,14 +3146,14 @@ class HttpWebServerPlugin(ProtocolHandlerPlugin):
 
     def on_client_data(self, raw: bytes) -> Optional[bytes]:
         if self.switched_protocol == httpProtocolTypes.WEBSOCKET:
-            remaining = raw
-            frame = WebsocketFrame()
-            while remaining != b'':
+            # Route was resolved once when connection was upgraded
+            assert self.route is not None
+            cur, end = 0, len(raw)
+            frame = self.websocket_frame
+            while cur < end:
                 # TODO: Teardown if invalid protocol exception
-                remaining = frame.parse(remaining)
-                for r in self.routes[httpProtocolTypes.WEBSOCKET]:
-                    if r == self.request.path:
-                        self.routes[httpProtocolTypes.WEBSOCKET][r].on_websocket_message(frame)
+                cur = frame.parse_at(raw, cur)
+                self.route.on_websocket_message(frame)
                 frame.reset()
             return None
         # If 1st valid request was completed and it's a HTTP/1.1 keep-alive
@@ -2379,19 +3180,20 @@ class HttpWebServerPlugin(ProtocolHandlerPlugin):
             return
         if self.switched_protocol:
             # Invoke plugin.on_websocket_close
-            for r in self.routes[httpProtocolTypes.WEBSOCKET]:
-                if r == self.request.path:
-                    self.routes[httpProtocolTypes.WEBSOCKET][r].on_websocket_close()
+            assert self.route is not None
+            self.route.on_websocket_close()
         self.access_log()
 
     def access_log(self) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
         logger.info(
-            '%s:%s - %s %s - %.2f ms' %
-            (self.client.addr[0],
-             self.client.addr[1],
-             text_(self.request.method),
-             text_(self.request.path),
-             (time.time() - self.start_time) * 1000))
+            '%s:%s - %s %s - %.2f ms',
+            self.client.addr[0],
+            self.client.addr[1],
+            text_(self.request.method),
+            text_(self.request.path),
+            (time.time() - self.start_time) * 1000)
 
     def get_descriptors(
             self) -> Tuple[List[socket.socket], List[socket.socket]]:
@@ -2411,17 +3213,25 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
         self.addr: Tuple[str, int] = addr
 
         self.start_time: float = time.time()
-        self.last_activity: float = self.start_time
+        # Monotonic, same clock Threadless schedules inactivity checks on
+        self.last_activity: float = time.monotonic()
 
         self.config: ProtocolConfig = config if config else ProtocolConfig()
         self.request: HttpParser = HttpParser(httpParserTypes.REQUEST_PARSER)
         self.response: HttpParser = HttpParser(httpParserTypes.RESPONSE_PARSER)
 
         self.selector = selectors.DefaultSelector()
+        # Descriptors currently registered with selector and their events.
+        self.registered: Dict[socket.socket, int] = {}
         self.client: TcpClientConnection = TcpClientConnection(
             self.fromfd(self.fileno), self.addr
         )
         self.plugins: Dict[str, ProtocolHandlerPlugin] = {}
+        # Plugins in invocation order, fixed once initialized
+        self.ordered_plugins: Tuple[ProtocolHandlerPlugin, ...] = ()
+        # Subsets of ordered_plugins that own descriptors / handle response chunks
+        self.descriptor_plugins: Tuple[ProtocolHandlerPlugin, ...] = ()
+        self.response_chunk_plugins: Tuple[ProtocolHandlerPlugin, ...] = ()
 
     def initialize(self) -> None:
         """Optionally upgrades connection to HTTPS, set conn in non-blocking mode and initializes plugins."""
@@ -2433,7 +3243,26 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
             for klass in self.config.plugins[b'ProtocolHandlerPlugin']:
                 instance = klass(self.config, self.client, self.request)
                 self.plugins[instance.name()] = instance
-        logger.debug('Handling connection %r' % self.client.connection)
+        self.ordered_plugins = tuple(self.plugins.values())
+        self.descriptor_plugins = tuple(
+            plugin for plugin in self.ordered_plugins if plugin.HAS_DESCRIPTORS)
+        self.response_chunk_plugins = tuple(
+            plugin for plugin in self.ordered_plugins if plugin.HAS_RESPONSE_CHUNK_HOOK)
+        logger.debug('Handling connection %r', self.client.connection)
+
+    def set_wakeup(self, wakeup: Callable[[], None]) -> None:
+        self.client.wakeup = wakeup
+
+    @classmethod
+    def housekeeping(cls, config: Optional[ProtocolConfig] = None, **kwargs: Any) -> Optional[float]:
+        timeout: Optional[float] = None
+        if config is None:
+            return timeout
+        for klass in config.plugins.get(b'ProtocolHandlerPlugin', []):
+            due_in = cast(Type[ProtocolHandlerPlugin], klass).housekeeping(config)
+            if due_in is not None:
+                timeout = due_in if timeout is None else min(timeout, due_in)
+        return timeout
 
     def is_inactive(self) -> bool:
         if not self.client.has_buffer() and \
@@ -2442,25 +3271,18 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
         return False
 
     def get_events(self) -> Dict[socket.socket, int]:
+        er, ew = selectors.EVENT_READ, selectors.EVENT_WRITE
         events: Dict[socket.socket, int] = {
-            self.client.connection: selectors.EVENT_READ
+            self.client.connection: er | ew if self.client.has_buffer() else er
         }
-        if self.client.has_buffer():
-            events[self.client.connection] |= selectors.EVENT_WRITE
 
         # ProtocolHandlerPlugin.get_descriptors
-        for plugin in self.plugins.values():
+        for plugin in self.descriptor_plugins:
             plugin_read_desc, plugin_write_desc = plugin.get_descriptors()
             for r in plugin_read_desc:
-                if r not in events:
-                    events[r] = selectors.EVENT_READ
-                else:
-                    events[r] |= selectors.EVENT_READ
+                events[r] = events.get(r, 0) | er
             for w in plugin_write_desc:
-                if w not in events:
-                    events[w] = selectors.EVENT_WRITE
-                else:
-                    events[w] |= selectors.EVENT_WRITE
+                events[w] = events.get(w, 0) | ew
 
         return events
 
@@ -2475,7 +3297,7 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
             return True
 
         # Invoke plugin.write_to_descriptors
-        for plugin in self.plugins.values():
+        for plugin in self.descriptor_plugins:
             teardown = plugin.write_to_descriptors(writables)
             if teardown:
                 return True
@@ -2486,7 +3308,7 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
             return True
 
         # Invoke plugin.read_from_descriptors
-        for plugin in self.plugins.values():
+        for plugin in self.descriptor_plugins:
             teardown = plugin.read_from_descriptors(readables)
             if teardown:
                 return True
@@ -2494,17 +3316,21 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
         return False
 
     def shutdown(self) -> None:
+        # Release persistent registrations, upstream connections
+        # may outlive this handler and flush registers client again.
+        self.update_registrations({})
+
         # Flush pending buffer if any
         self.flush()
 
         # Invoke plugin.on_client_connection_close
-        for plugin in self.plugins.values():
+        for plugin in self.ordered_plugins:
             plugin.on_client_connection_close()
 
         logger.debug(
             'Closing client connection %r '
-            'at address %r with pending client buffer size %d bytes' %
-            (self.client.connection, self.client.addr, self.client.buffer_size()))
+            'at address %r with pending client buffer size %d bytes',
+            self.client.connection, self.client.addr, self.client.buffer_size())
 
         conn = self.client.connection
         try:
@@ -2533,19 +3359,11 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
         Shutdown and closes client connection upon error.
         """
         if self.config.encryption_enabled():
-            ctx = ssl.create_default_context(
-                ssl.Purpose.CLIENT_AUTH)
-            ctx.options |= ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3 | ssl.OP_NO_TLSv1 | ssl.OP_NO_TLSv1_1
-            ctx.verify_mode = ssl.CERT_NONE
-            assert self.config.keyfile and self.config.certfile
-            ctx.load_cert_chain(
-                certfile=self.config.certfile,
-                keyfile=self.config.keyfile)
-            conn = ctx.wrap_socket(conn, server_side=True)
+            conn = self.config.encryption_ssl_context().wrap_socket(conn, server_side=True)
         return conn
 
     def connection_inactive_for(self) -> float:
-        return time.time() - self.last_activity
+        return time.monotonic() - self.last_activity
 
     def flush(self) -> None:
         if not self.client.has_buffer():
@@ -2565,14 +3383,15 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
     def handle_writables(self, writables: List[Union[int, _HasFileno]]) -> bool:
         if self.client.buffer_size() > 0 and self.client.connection in writables:
             logger.debug('Client is ready for writes, flushing buffer')
-            self.last_activity = time.time()
+            self.last_activity = time.monotonic()
 
             # Invoke plugin.on_response_chunk
-            chunk = self.client.buffer
-            for plugin in self.plugins.values():
-                chunk = plugin.on_response_chunk(chunk)
-                if chunk is None:
-                    break
+            if self.response_chunk_plugins:
+                chunk = self.client.buffer
+                for plugin in self.response_chunk_plugins:
+                    chunk = plugin.on_response_chunk(chunk)
+                    if chunk is None:
+                        break
 
             try:
                 self.client.flush()
@@ -2588,7 +3407,7 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
     def handle_readables(self, readables: List[Union[int, _HasFileno]]) -> bool:
         if self.client.connection in readables:
             logger.debug('Client is ready for reads, reading')
-            self.last_activity = time.time()
+            self.last_activity = time.monotonic()
             client_data: Optional[bytes] = None
 
             try:
@@ -2613,13 +3432,10 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
             try:
                 # ProtocolHandlerPlugin.on_client_data
                 # Can raise ProtocolException to teardown the connection
-                plugin_index = 0
-                plugins = list(self.plugins.values())
-                while plugin_index < len(plugins) and client_data:
-                    client_data = plugins[plugin_index].on_client_data(client_data)
-                    if client_data is None:
+                for plugin in self.ordered_plugins:
+                    client_data = plugin.on_client_data(client_data)
+                    if not client_data:
                         break
-                    plugin_index += 1
 
                 # Don't parse request any further after 1st request has completed.
                 # This specially does happen for pipeline requests.
@@ -2630,13 +3446,13 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
                     self.request.parse(client_data)
                     if self.request.state == httpParserStates.COMPLETE:
                         # Invoke plugin.on_request_complete
-                        for plugin in self.plugins.values():
+                        for plugin in self.ordered_plugins:
                             upgraded_sock = plugin.on_request_complete()
                             if isinstance(upgraded_sock, ssl.SSLSocket):
                                 logger.debug(
                                     'Updated client conn to %s', upgraded_sock)
                                 self.client._conn = upgraded_sock
-                                for plugin_ in self.plugins.values():
+                                for plugin_ in self.ordered_plugins:
                                     if plugin_ != plugin:
                                         plugin_.client._conn = upgraded_sock
                             elif isinstance(upgraded_sock, bool) and upgraded_sock is True:
@@ -2655,9 +3471,7 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
             Generator[Tuple[List[Union[int, _HasFileno]],
                             List[Union[int, _HasFileno]]],
                       None, None]:
-        events = self.get_events()
-        for fd in events:
-            self.selector.register(fd, events[fd])
+        self.update_registrations(self.get_events())
         ev = self.selector.select(timeout=1)
         readables = []
         writables = []
@@ -2667,8 +3481,20 @@ class ProtocolHandler(threading.Thread, ThreadlessWork):
             if mask & selectors.EVENT_WRITE:
                 writables.append(key.fileobj)
         yield (readables, writables)
-        for fd in events.keys():
+
+    def update_registrations(self, events: Dict[socket.socket, int]) -> None:
+        """Sync selector with events, registrations persist across iterations."""
+        # Unregister stale descriptors first, their fd may since
+        # have been reused by a descriptor registered below.
+        for fd in [fd for fd in self.registered if fd not in events]:
             self.selector.unregister(fd)
+            del self.registered[fd]
+        for fd, mask in events.items():
+            if fd not in self.registered:
+                self.selector.register(fd, mask)
+            elif self.registered[fd] != mask:
+                self.selector.modify(fd, mask)
+            self.registered[fd] = mask
 
     def run_once(self) -> bool:
         with self.selected_events() as (readables, writables):
@@ -2713,13 +3539,51 @@ class DevtoolsProtocolPlugin(ProtocolHandlerPlugin):
 
     frame_id = secrets.token_hex(8)
     loader_id = secrets.token_hex(8)
+    # Request ids are made unique across processes by pid prefix
+    request_ids = itertools.count()
+
+    # Placeholder response details sent with every Network.responseReceived event
+    RESPONSE_RECEIVED_DETAILS: Dict[str, Any] = {
+        'url': '',
+        'status': '',
+        'statusText': '',
+        'headers': '',
+        'headersText': '',
+        'mimeType': '',
+        'connectionReused': True,
+        'connectionId': '',
+        'encodedDataLength': '',
+        'fromDiskCache': False,
+        'fromServiceWorker': False,
+        'timing': {
+            'requestTime': '',
+            'proxyStart': -1,
+            'proxyEnd': -1,
+            'dnsStart': -1,
+            'dnsEnd': -1,
+            'connectStart': -1,
+            'connectEnd': -1,
+            'sslStart': -1,
+            'sslEnd': -1,
+            'workerStart': -1,
+            'workerReady': -1,
+            'sendStart': 0,
+            'sendEnd': 0,
+            'receiveHeadersEnd': 0,
+        },
+        'requestHeaders': '',
+        'remoteIPAddress': '',
+        'remotePort': '',
+    }
+
+    HAS_DESCRIPTORS = False
 
     def __init__(
             self,
             config: ProtocolConfig,
             client: TcpClientConnection,
             request: HttpParser):
-        self.id: str = f'{ os.getpid() }-{ threading.get_ident() }-{ time.time() }'
+        self.id: str = f'{ os.getpid() }-{ next(self.request_ids) }'
         self.response = HttpParser(httpParserTypes.RESPONSE_PARSER)
         super().__init__(config, client, request)
 
@@ -2742,10 +3606,10 @@ class DevtoolsProtocolPlugin(ProtocolHandlerPlugin):
 
         # Handle devtool frontend websocket upgrade
         if self.config.devtools_event_queue:
-            self.config.devtools_event_queue.put({
+            self.config.devtools_event_queue.put([{
                 'method': 'Network.requestWillBeSent',
                 'params': self.request_will_be_sent(),
-            })
+            }])
         return False
 
     def on_response_chunk(self, chunk: bytes) -> bytes:
@@ -2754,22 +3618,29 @@ class DevtoolsProtocolPlugin(ProtocolHandlerPlugin):
             return chunk
 
         if self.config.devtools_event_queue:
+            # Response and loading events are only emitted when
+            # parser state first crosses them, not for every chunk.
+            prev_state = self.response.state
             self.response.parse(chunk)
-            if self.response.state >= httpParserStates.HEADERS_COMPLETE:
-                self.config.devtools_event_queue.put({
+            evs = []
+            if prev_state < httpParserStates.HEADERS_COMPLETE <= self.response.state:
+                evs.append({
                     'method': 'Network.responseReceived',
                     'params': self.response_received(),
                 })
             if self.response.state >= httpParserStates.RCVING_BODY:
-                self.config.devtools_event_queue.put({
+                evs.append({
                     'method': 'Network.dataReceived',
                     'params': self.data_received(chunk)
                 })
-            if self.response.state == httpParserStates.COMPLETE:
-                self.config.devtools_event_queue.put({
+            if self.response.state == httpParserStates.COMPLETE and \
+                    prev_state != httpParserStates.COMPLETE:
+                evs.append({
                     'method': 'Network.loadingFinished',
                     'params': self.loading_finished()
                 })
+            if evs:
+                self.config.devtools_event_queue.put(evs)
         return chunk
 
     def on_client_connection_close(self) -> None:
@@ -2790,7 +3661,8 @@ class DevtoolsProtocolPlugin(ProtocolHandlerPlugin):
                 ),
                 'urlFragment': '',
                 'method': text_(self.request.method),
-                'headers': {text_(v[0]): text_(v[1]) for v in self.request.headers.values()},
+                # Header names and values are always bytes, decode them directly
+                'headers': {k.decode('utf-8'): v.decode('utf-8') for k, v in self.request.headers.values()},
                 'initialPriority': 'High',
                 'mixedContentType': 'none',
                 'postData': None if self.request.method != 'POST'
@@ -2817,38 +3689,7 @@ class DevtoolsProtocolPlugin(ProtocolHandlerPlugin):
             'type': text_(self.response.header(b'content-type'))
             if self.response.has_header(b'content-type')
             else 'Other',
-            'response': {
-                'url': '',
-                'status': '',
-                'statusText': '',
-                'headers': '',
-                'headersText': '',
-                'mimeType': '',
-                'connectionReused': True,
-                'connectionId': '',
-                'encodedDataLength': '',
-                'fromDiskCache': False,
-                'fromServiceWorker': False,
-                'timing': {
-                    'requestTime': '',
-                    'proxyStart': -1,
-                    'proxyEnd': -1,
-                    'dnsStart': -1,
-                    'dnsEnd': -1,
-                    'connectStart': -1,
-                    'connectEnd': -1,
-                    'sslStart': -1,
-                    'sslEnd': -1,
-                    'workerStart': -1,
-                    'workerReady': -1,
-                    'sendStart': 0,
-                    'sendEnd': 0,
-                    'receiveHeadersEnd': 0,
-                },
-                'requestHeaders': '',
-                'remoteIPAddress': '',
-                'remotePort': '',
-            }
+            'response': self.RESPONSE_RECEIVED_DETAILS,
         }
 
     def data_received(self, chunk: bytes) -> Dict[str, Any]:
@@ -2872,6 +3713,28 @@ def is_py3() -> bool:
     return sys.version_info[0] == 3
 
 
+def default_num_workers() -> int:
+    """Number of CPUs this process may run on, respects affinity and cpusets."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover
+        return os.cpu_count() or 1
+
+
+def listen_backlog(backlog: int) -> int:
+    """Caps listen backlog at kernel somaxconn on supported OS."""
+    try:
+        with open('/proc/sys/net/core/somaxconn', 'rb') as f:
+            somaxconn = int(f.read())
+    except (OSError, ValueError):
+        return backlog
+    if backlog > somaxconn:
+        logger.warning(
+            'Listen backlog truncated from %d to %d by kernel somaxconn', backlog, somaxconn)
+        return somaxconn
+    return backlog
+
+
 def set_open_file_limit(soft_limit: int) -> None:
     """Configure open file description soft limit on supported OS."""
     if os.name != 'nt':  # resource module not available on Windows OS
@@ -2881,8 +3744,7 @@ def set_open_file_limit(soft_limit: int) -> None:
             resource.setrlimit(
                 resource.RLIMIT_NOFILE, (soft_limit, curr_hard_limit))
             logger.debug(
-                'Open file descriptor soft limit set to %d' %
-                soft_limit)
+                'Open file descriptor soft limit set to %d', soft_limit)
 
 
 def load_plugins(plugins: bytes) -> Dict[bytes, List[type]]:
@@ -2902,7 +3764,7 @@ def load_plugins(plugins: bytes) -> Dict[bytes, List[type]]:
             importlib.import_module(
                 __name__ if module_name == 'proxy' else module_name),
             klass_name)
-        base_klass = inspect.getmro(klass)[1]
+        base_klass = klass.__mro__[1]
         p[bytes_(base_klass.__name__)].append(klass)
         logger.info(
             'Loaded %s %s.%s',
@@ -2946,7 +3808,8 @@ def init_parser() -> argparse.ArgumentParser:
         '--backlog',
         type=int,
         default=DEFAULT_BACKLOG,
-        help='Default: 100. Maximum number of pending connections to proxy server')
+        help='Default: 1024. Maximum number of pending connections to proxy server, '
+             'capped at net.core.somaxconn on Linux.')
     parser.add_argument(
         '--basic-auth',
         type=str,
@@ -3020,6 +3883,14 @@ def init_parser() -> argparse.ArgumentParser:
         default=DEFAULT_ENABLE_DEVTOOLS,
         help='Default: False.  Enables integration with Chrome Devtool Frontend.'
     )
+    parser.add_argument(
+        '--enable-reuse-port',
+        action='store_true',
+        default=DEFAULT_ENABLE_REUSE_PORT,
+        help='Default: False.  Each worker binds its own SO_REUSEPORT socket '
+             'and kernel balances connections across them.  By default workers '
+             'share a single listening socket.'
+    )
     parser.add_argument(
         '--enable-static-server',
         action='store_true',
@@ -3029,6 +3900,14 @@ def init_parser() -> argparse.ArgumentParser:
              'from custom directory.  By default, static file server serves '
              'from public folder.'
     )
+    parser.add_argument(
+        '--enable-upstream-keep-alive',
+        action='store_true',
+        default=DEFAULT_ENABLE_UPSTREAM_KEEP_ALIVE,
+        help='Default: False.  Park idle keep-alive upstream connections '
+             'and reuse them for subsequent requests to the same upstream, '
+             'including requests from other clients.'
+    )
     parser.add_argument(
         '--enable-web-server',
         action='store_true',
@@ -3057,7 +3936,7 @@ def init_parser() -> argparse.ArgumentParser:
     parser.add_argument('--log-format', type=str, default=DEFAULT_LOG_FORMAT,
                         help='Log format for Python logger.')
     parser.add_argument('--num-workers', type=int, default=DEFAULT_NUM_WORKERS,
-                        help='Defaults to number of CPU cores.')
+                        help='Defaults to number of CPU cores available to proxy.py.')
     parser.add_argument(
         '--open-file-limit',
         type=int,
@@ -3129,6 +4008,81 @@ def init_parser() -> argparse.ArgumentParser:
     return parser
 
 
+def read_pid_file(pid_file: str) -> Optional[int]:
+    """Returns pid stored in pid_file, None if missing or unparsable."""
+    try:
+        with open(pid_file, 'rb') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def is_process_running(pid: int) -> bool:
+    if os.name == 'nt':
+        # os.kill would terminate the process on Windows, treat pid
+        # file as stale and overwrite it like earlier releases did.
+        return False    # pragma: no cover
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_pid_file(pid_file: str) -> None:
+    """Atomically creates pid_file containing pid of current process.
+
+    An existing pid file is only replaced when process it names is no
+    longer running, otherwise raises FileExistsError."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_CLOEXEC', 0)
+    try:
+        fd = os.open(pid_file, flags, 0o644)
+    except FileExistsError:
+        pid = read_pid_file(pid_file)
+        if pid is not None and pid != os.getpid() and is_process_running(pid):
+            raise
+        # Stale pid file left behind by a crashed instance
+        os.unlink(pid_file)
+        fd = os.open(pid_file, flags, 0o644)
+    try:
+        os.write(fd, bytes_(os.getpid()))
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def remove_pid_file(pid_file: str) -> None:
+    """Removes pid_file unless it now belongs to another process."""
+    if read_pid_file(pid_file) not in (None, os.getpid()):
+        return
+    try:
+        os.unlink(pid_file)
+    except FileNotFoundError:
+        pass
+
+
+def wait_for_shutdown_signal() -> None:
+    """Blocks until SIGINT or SIGTERM is received.
+
+    Handlers are only installed when called from main thread, elsewhere
+    blocks until a KeyboardInterrupt is raised.  Previous handlers are
+    restored before returning."""
+    shutdown = threading.Event()
+    if threading.current_thread() is not threading.main_thread():
+        shutdown.wait()     # pragma: no cover
+        return
+    signals = (signal.SIGINT, signal.SIGTERM)
+    handlers = {signum: signal.signal(signum, lambda _signum, _frame: shutdown.set())
+                for signum in signals}
+    try:
+        shutdown.wait()
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+
 def main(input_args: List[str]) -> None:
     if not is_py3() and not UNDER_TEST:
         print(
@@ -3196,19 +4150,22 @@ def main(input_args: List[str]) -> None:
             ca_signing_key_file=args.ca_signing_key_file,
             hostname=ipaddress.ip_address(args.hostname),
             port=args.port,
-            backlog=args.backlog,
-            num_workers=args.num_workers if args.num_workers > 0 else multiprocessing.cpu_count(),
+            backlog=listen_backlog(args.backlog),
+            num_workers=args.num_workers if args.num_workers > 0 else default_num_workers(),
             static_server_dir=args.static_server_dir,
             enable_static_server=args.enable_static_server,
             devtools_event_queue=devtools_event_queue,
             devtools_ws_path=args.devtools_ws_path,
             timeout=args.timeout,
-            threadless=args.threadless)
+            threadless=args.threadless,
+            reuse_port=args.enable_reuse_port,
+            enable_upstream_keep_alive=args.enable_upstream_keep_alive)
 
         config.plugins = load_plugins(
             bytes_(
                 '%s%s' %
                 (default_plugins, args.plugins)))
+        config.warm_ssl_contexts()
 
         acceptor_pool = AcceptorPool(
             hostname=config.hostname,
@@ -3216,17 +4173,21 @@ def main(input_args: List[str]) -> None:
             backlog=config.backlog,
             num_workers=config.num_workers,
             threadless=config.threadless,
+            reuse_port=config.reuse_port,
             work_klass=ProtocolHandler,
             config=config)
         if args.pid_file:
-            with open(args.pid_file, 'wb') as pid_file:
-                pid_file.write(bytes_(os.getpid()))
+            try:
+                write_pid_file(args.pid_file)
+            except FileExistsError:
+                logger.error(
+                    'proxy.py already running with pid %s, see %s',
+                    read_pid_file(args.pid_file), args.pid_file)
+                sys.exit(1)
         acceptor_pool.setup()
 
         try:
-            # TODO: Introduce cron feature instead of mindless sleep
-            while True:
-                time.sleep(1)
+            wait_for_shutdown_signal()
         except Exception as e:
             logger.exception('exception', exc_info=e)
         finally:
@@ -3235,8 +4196,7 @@ def main(input_args: List[str]) -> None:
         pass
     finally:
         if args.pid_file:
-            if os.path.exists(args.pid_file):
-                os.remove(args.pid_file)
+            remove_pid_file(args.pid_file)
 
 
 if __name__ == '__main__':
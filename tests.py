@@ -8,19 +8,26 @@
     :license: BSD, see LICENSE for more details.
 """
 import base64
+import errno
 import ipaddress
 import json
 import logging
 import multiprocessing
 import os
+import pickle
+import queue
 import selectors
+import signal
 import socket
 import ssl
+import subprocess
 import tempfile
+import threading
+import time
 import unittest
 import uuid
 from contextlib import closing
-from typing import Dict, Optional, Tuple, Union, Any, cast, Type
+from typing import Dict, List, Optional, Tuple, Union, Any, cast, Type
 from unittest import mock
 from urllib import parse as urlparse
 
@@ -46,6 +53,16 @@ def get_available_port() -> int:
         return int(port)
 
 
+def recv_into_from_recv(conn: mock.Mock) -> mock.Mock:
+    """Serves recv_into calls on mocked conn with data configured for conn.recv."""
+    def recv_into(buffer: bytearray, nbytes: int = 0) -> int:
+        data = conn.recv(nbytes or len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+    conn.recv_into.side_effect = recv_into
+    return conn
+
+
 def get_plugin_by_test_name(test_name: str) -> Type[proxy.HttpProxyBasePlugin]:
     plugin: Type[proxy.HttpProxyBasePlugin] = plugin_examples.ModifyPostDataPlugin
     if test_name == 'test_modify_post_data_plugin':
@@ -128,6 +145,90 @@ class TestTcpConnection(unittest.TestCase):
         self.conn.flush()
         self.assertTrue(not _conn.send.called)
 
+    def testQueueFromAnotherThreadDuringFlush(self) -> None:
+        _conn = mock.MagicMock()
+        self.conn = TestTcpConnection.TcpConnectionToTest(_conn)
+        self.conn.queue(b'hello')
+        errors: List[Exception] = []
+
+        def queue_more() -> None:
+            try:
+                self.conn.queue(b'world')
+            except Exception as e:
+                errors.append(e)
+
+        queuer = threading.Thread(target=queue_more)
+
+        def send(data: memoryview) -> int:
+            queuer.start()
+            queuer.join(0.1)
+            return len(data)
+        _conn.send.side_effect = send
+        self.assertEqual(self.conn.flush(), 5)
+        queuer.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.conn.buffer, b'world')
+
+    def testTcpServerConnectionRecvCopiesOnlyReceivedBytes(self) -> None:
+        conn, peer = socket.socketpair()
+        server = proxy.TcpServerConnection('127.0.0.1', 8899)
+        server._conn = conn
+        try:
+            peer.sendall(b'hello')
+            data = server.recv(1024)
+            self.assertEqual(data, b'hello')
+            self.assertIsInstance(data, bytes)
+            peer.sendall(b'world')
+            self.assertEqual(server.recv(1024), b'world')
+            self.assertEqual(data, b'hello')
+            peer.close()
+            self.assertIsNone(server.recv(1024))
+        finally:
+            conn.close()
+
+    def testTcpClientConnectionRecvSharesBufferWithServer(self) -> None:
+        client_sock, client_peer = socket.socketpair()
+        server_sock, server_peer = socket.socketpair()
+        client = proxy.TcpClientConnection(client_sock, ('127.0.0.1', 54382))
+        server = proxy.TcpServerConnection('127.0.0.1', 8899)
+        server._conn = server_sock
+        try:
+            client_peer.sendall(b'request')
+            server_peer.sendall(b'response')
+            request = client.recv(1024)
+            self.assertEqual(server.recv(1024), b'response')
+            self.assertEqual(request, b'request')
+        finally:
+            for sock in (client_sock, client_peer, server_sock, server_peer):
+                sock.close()
+
+    @unittest.skipUnless(hasattr(os, 'splice'), 'os.splice not available')
+    def testSpliceTo(self) -> None:
+        src_peer, src_sock = socket.socketpair()
+        dst_sock, dst_peer = socket.socketpair()
+        src_sock.setblocking(False)
+        dst_sock.setblocking(False)
+        src = TestTcpConnection.TcpConnectionToTest(src_sock)
+        dst = TestTcpConnection.TcpConnectionToTest(dst_sock)
+        try:
+            self.assertTrue(src.can_splice_to(dst))
+            src_peer.sendall(b'hello world')
+            self.assertEqual(src.splice_to(dst), 11)
+            self.assertFalse(dst.has_buffer())
+            self.assertEqual(dst_peer.recv(1024), b'hello world')
+            src_peer.close()
+            self.assertIsNone(src.splice_to(dst))
+        finally:
+            src.close()
+            dst.close()
+            dst_peer.close()
+
+    def testCannotSpliceToWithPendingBuffer(self) -> None:
+        src = TestTcpConnection.TcpConnectionToTest(mock.MagicMock(spec=socket.socket))
+        dst = TestTcpConnection.TcpConnectionToTest(mock.MagicMock(spec=socket.socket))
+        dst.queue(b'pending')
+        self.assertFalse(src.can_splice_to(dst))
+
     @mock.patch('socket.socket')
     def testTcpServerEstablishesIPv6Connection(
             self, mock_socket: mock.Mock) -> None:
@@ -236,7 +337,9 @@ class TestAcceptorPool(unittest.TestCase):
             mock_pipe: mock.Mock,
             _mock_send_handle: mock.Mock) -> None:
         mock_worker1 = mock.MagicMock()
+        mock_worker1.is_alive.return_value = False
         mock_worker2 = mock.MagicMock()
+        mock_worker2.is_alive.return_value = False
         mock_worker.side_effect = [mock_worker1, mock_worker2]
 
         num_workers = 2
@@ -250,6 +353,7 @@ class TestAcceptorPool(unittest.TestCase):
             num_workers,
             threadless=proxy.DEFAULT_THREADLESS,
             work_klass=work_klass,
+            reuse_port=False,
             **kwargs
         )
 
@@ -277,6 +381,125 @@ class TestAcceptorPool(unittest.TestCase):
         mock_worker1.join.assert_called()
         mock_worker2.join.assert_called()
 
+    def new_reuse_port_pool(self, port: int = proxy.DEFAULT_PORT) -> proxy.AcceptorPool:
+        return proxy.AcceptorPool(
+            ipaddress.ip_address(proxy.DEFAULT_IPV6_HOSTNAME),
+            port,
+            proxy.DEFAULT_BACKLOG,
+            2,
+            threadless=proxy.DEFAULT_THREADLESS,
+            work_klass=mock.MagicMock(),
+            reuse_port=True,
+            config=proxy.ProtocolConfig(),
+        )
+
+    @unittest.skipUnless(hasattr(socket, 'SO_REUSEPORT'), 'SO_REUSEPORT unavailable')
+    @mock.patch('proxy.send_handle')
+    @mock.patch('multiprocessing.Pipe')
+    @mock.patch('socket.socket')
+    @mock.patch('proxy.Acceptor')
+    def test_setup_with_reuse_port(
+            self,
+            mock_worker: mock.Mock,
+            mock_socket: mock.Mock,
+            mock_pipe: mock.Mock,
+            mock_send_handle: mock.Mock) -> None:
+        parent_end, child_end = mock.MagicMock(), mock.MagicMock()
+        parent_end.recv.return_value = None
+        mock_pipe.return_value = (parent_end, child_end)
+        mock_worker.return_value.is_alive.return_value = False
+        acceptor = self.new_reuse_port_pool()
+
+        acceptor.setup()
+
+        # Probe without SO_REUSEPORT, then reserve address with it
+        self.assertEqual(mock_socket.call_count, 2)
+        sock = mock_socket.return_value
+        sock.setsockopt.assert_any_call(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind.assert_called_with((str(acceptor.hostname), acceptor.port))
+        sock.listen.assert_not_called()
+        sock.close.assert_called()
+        mock_send_handle.assert_not_called()
+        self.assertEqual(mock_worker.call_count, 2)
+        mock_worker.assert_called_with(
+            socket.AF_INET6,
+            proxy.DEFAULT_THREADLESS,
+            child_end,
+            acceptor.work_klass,
+            listen_addr=(str(acceptor.hostname), acceptor.port),
+            backlog=acceptor.backlog,
+            **acceptor.kwargs
+        )
+        mock_worker.return_value.start.assert_called()
+        child_end.close.assert_called()
+        self.assertEqual(parent_end.recv.call_count, 2)
+
+        acceptor.shutdown()
+        mock_worker.return_value.join.assert_called()
+
+    @unittest.skipUnless(hasattr(socket, 'SO_REUSEPORT'), 'SO_REUSEPORT unavailable')
+    @mock.patch('socket.socket')
+    @mock.patch('proxy.Acceptor')
+    def test_setup_with_reuse_port_fails_when_address_in_use(
+            self,
+            mock_worker: mock.Mock,
+            mock_socket: mock.Mock) -> None:
+        mock_socket.return_value.__enter__.return_value.bind.side_effect = \
+            OSError(errno.EADDRINUSE, 'Address already in use')
+        acceptor = self.new_reuse_port_pool()
+        with self.assertRaises(OSError):
+            acceptor.setup()
+        mock_worker.assert_not_called()
+
+    @unittest.skipUnless(hasattr(socket, 'SO_REUSEPORT'), 'SO_REUSEPORT unavailable')
+    @mock.patch('multiprocessing.Pipe')
+    @mock.patch('socket.socket')
+    @mock.patch('proxy.Acceptor')
+    def test_setup_with_reuse_port_fails_when_worker_cannot_listen(
+            self,
+            mock_worker: mock.Mock,
+            mock_socket: mock.Mock,
+            mock_pipe: mock.Mock) -> None:
+        listening, failed = mock.MagicMock(), mock.MagicMock()
+        listening.recv.return_value = None
+        failed.recv.return_value = OSError(errno.EADDRINUSE, 'Address already in use')
+        mock_pipe.side_effect = [(listening, mock.MagicMock()), (failed, mock.MagicMock())]
+        mock_worker.return_value.is_alive.return_value = False
+        acceptor = self.new_reuse_port_pool()
+        with self.assertRaises(OSError):
+            acceptor.setup()
+        # Workers that did start listening are shut down
+        mock_worker.return_value.join.assert_called()
+        mock_socket.return_value.close.assert_called()
+
+    @mock.patch('proxy.send_handle')
+    @mock.patch('multiprocessing.Pipe')
+    @mock.patch('socket.socket')
+    @mock.patch('proxy.Acceptor')
+    def test_setup_with_reuse_port_disabled_for_ephemeral_port(
+            self,
+            mock_worker: mock.Mock,
+            mock_socket: mock.Mock,
+            _mock_pipe: mock.Mock,
+            mock_send_handle: mock.Mock) -> None:
+        acceptor = self.new_reuse_port_pool(port=0)
+        acceptor.setup()
+        self.assertFalse(acceptor.reuse_port)
+        mock_socket.return_value.listen.assert_called_with(acceptor.backlog)
+        self.assertEqual(mock_send_handle.call_count, 2)
+        self.assertNotIn('listen_addr', mock_worker.call_args[1])
+
+    @mock.patch('os.kill')
+    def test_join_processes_interrupts_after_timeout(self, mock_kill: mock.Mock) -> None:
+        exited = mock.MagicMock(pid=1234)
+        exited.is_alive.return_value = False
+        alive = mock.MagicMock(pid=5678)
+        alive.is_alive.return_value = True
+        proxy.join_processes([exited, alive], timeout=0)
+        exited.join.assert_has_calls([mock.call(0), mock.call()])
+        alive.join.assert_has_calls([mock.call(0), mock.call()])
+        mock_kill.assert_called_once_with(5678, signal.SIGINT)
+
 
 class TestWorker(unittest.TestCase):
 
@@ -340,6 +563,101 @@ class TestWorker(unittest.TestCase):
 
         self.mock_protocol_handler.assert_not_called()
 
+    @unittest.skipUnless(hasattr(socket, 'SO_REUSEPORT'), 'SO_REUSEPORT unavailable')
+    @mock.patch.object(proxy.Acceptor, 'lock')
+    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('socket.socket')
+    @mock.patch('proxy.recv_handle')
+    def test_listens_with_reuse_port(
+            self,
+            mock_recv_handle: mock.Mock,
+            mock_socket: mock.Mock,
+            mock_selector: mock.Mock,
+            mock_lock: mock.Mock) -> None:
+        work_queue = mock.MagicMock()
+        worker = proxy.Acceptor(
+            socket.AF_INET6,
+            proxy.DEFAULT_THREADLESS,
+            work_queue,
+            self.mock_protocol_handler,
+            listen_addr=(str(proxy.DEFAULT_IPV6_HOSTNAME), proxy.DEFAULT_PORT),
+            backlog=proxy.DEFAULT_BACKLOG,
+            config=self.protocol_config)
+        sock = mock_socket.return_value
+        selector = mock_selector.return_value
+        selector.select.side_effect = KeyboardInterrupt()
+
+        worker.run()
+
+        work_queue.send.assert_called_once_with(None)
+
+        mock_recv_handle.assert_not_called()
+        mock_socket.assert_called_with(socket.AF_INET6, socket.SOCK_STREAM)
+        sock.setsockopt.assert_any_call(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt.assert_any_call(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind.assert_called_with((str(proxy.DEFAULT_IPV6_HOSTNAME), proxy.DEFAULT_PORT))
+        sock.listen.assert_called_with(proxy.DEFAULT_BACKLOG)
+        sock.setblocking.assert_called_with(False)
+        selector.register.assert_called_with(sock, selectors.EVENT_READ)
+        selector.select.assert_called_with(timeout=1)
+        mock_lock.__enter__.assert_not_called()
+        sock.close.assert_called()
+
+    @unittest.skipUnless(hasattr(socket, 'SO_REUSEPORT'), 'SO_REUSEPORT unavailable')
+    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('socket.socket')
+    def test_reports_reuse_port_bind_error(
+            self,
+            mock_socket: mock.Mock,
+            mock_selector: mock.Mock) -> None:
+        error = OSError(errno.EADDRINUSE, 'Address already in use')
+        mock_socket.return_value.bind.side_effect = error
+        work_queue = mock.MagicMock()
+        worker = proxy.Acceptor(
+            socket.AF_INET6,
+            proxy.DEFAULT_THREADLESS,
+            work_queue,
+            self.mock_protocol_handler,
+            listen_addr=(str(proxy.DEFAULT_IPV6_HOSTNAME), proxy.DEFAULT_PORT),
+            config=self.protocol_config)
+
+        worker.run()
+
+        work_queue.send.assert_called_once_with(error)
+        work_queue.close.assert_called()
+        mock_selector.return_value.register.assert_not_called()
+
+    @mock.patch('selectors.DefaultSelector')
+    @mock.patch('socket.fromfd')
+    @mock.patch('proxy.recv_handle')
+    def test_accepts_all_pending_clients_per_wakeup(
+            self,
+            mock_recv_handle: mock.Mock,
+            mock_fromfd: mock.Mock,
+            mock_selector: mock.Mock) -> None:
+        sock = mock_fromfd.return_value
+        conn1, conn2 = mock.MagicMock(), mock.MagicMock()
+        addr1, addr2 = mock.MagicMock(), mock.MagicMock()
+        sock.accept.side_effect = [(conn1, addr1), (conn2, addr2), BlockingIOError()]
+        mock_recv_handle.return_value = 10
+
+        selector = mock_selector.return_value
+        selector.select.side_effect = [[(None, None)], KeyboardInterrupt()]
+
+        self.worker.run()
+
+        sock.setblocking.assert_called_with(False)
+        self.assertEqual(sock.accept.call_count, 3)
+        self.assertEqual(selector.select.call_count, 2)
+        self.assertEqual(self.mock_protocol_handler.housekeeping.call_count, 2)
+        self.mock_protocol_handler.housekeeping.assert_called_with(config=self.protocol_config)
+        self.mock_protocol_handler.assert_has_calls([
+            mock.call(fileno=conn1.fileno(), addr=addr1, config=self.protocol_config),
+            mock.call().start(),
+            mock.call(fileno=conn2.fileno(), addr=addr2, config=self.protocol_config),
+            mock.call().start(),
+        ])
+
     @mock.patch('selectors.DefaultSelector')
     @mock.patch('socket.fromfd')
     @mock.patch('proxy.recv_handle')
@@ -380,6 +698,213 @@ class TestWorker(unittest.TestCase):
         sock.close.assert_called()
 
 
+class TestClientQueue(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.acceptor_end, self.threadless_end = proxy.new_client_queue()
+
+    def tearDown(self) -> None:
+        self.acceptor_end.close()
+        self.threadless_end.close()
+
+    def assert_client_passed(self, addr: Tuple[str, int]) -> None:
+        conn, peer = socket.socketpair()
+        try:
+            proxy.send_client(self.acceptor_end, conn.fileno(), addr, os.getpid())
+            fileno, received = proxy.recv_client(self.threadless_end)
+            self.assertEqual(received, addr)
+            with socket.socket(fileno=fileno) as passed:
+                passed.sendall(b'hello')
+                self.assertEqual(peer.recv(5), b'hello')
+        finally:
+            conn.close()
+            peer.close()
+
+    def test_passes_ipv4_client(self) -> None:
+        self.assert_client_passed(('127.0.0.1', 54382))
+
+    def test_passes_ipv6_client(self) -> None:
+        self.assert_client_passed(('::1', 54382))
+
+
+class TestThreadless(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.work_klass = mock.MagicMock()
+        self.work_klass.housekeeping.return_value = None
+        self.threadless = proxy.Threadless(mock.MagicMock(), self.work_klass)
+        self.selector = mock.MagicMock()
+        self.threadless.selector = self.selector
+        self.work = mock.MagicMock()
+        self.threadless.works[10] = self.work
+        self.threadless.dirty.add(10)
+
+    def test_wake_interrupts_select_and_resyncs_work(self) -> None:
+        self.threadless.selector = selectors.DefaultSelector()
+        self.threadless.setup_waker()
+        self.work.get_events.return_value = {}
+        self.threadless.update_registrations()
+        self.threadless.schedule_inactivity_check(10, time.monotonic())
+        self.work.is_inactive.return_value = False
+
+        timer = threading.Timer(0.05, self.threadless.wake, (10,))
+        timer.start()
+        started = time.monotonic()
+        try:
+            self.threadless.run_once()
+        finally:
+            timer.cancel()
+            assert self.threadless.waker is not None
+            for sock in self.threadless.waker:
+                sock.close()
+            self.threadless.selector.close()
+        self.assertLess(time.monotonic() - started, proxy.Threadless.INACTIVITY_CHECK_INTERVAL)
+        self.assertEqual(self.threadless.dirty, {10})
+        self.assertEqual(self.threadless.woken, [])
+
+    def test_select_timeout_covers_work_klass_housekeeping(self) -> None:
+        housekeeping = self.work_klass.housekeeping
+        self.assertIsNone(self.threadless.select_timeout())
+        housekeeping.return_value = 2.5
+        self.assertEqual(self.threadless.select_timeout(), 2.5)
+        self.threadless.schedule_inactivity_check(10, time.monotonic())
+        self.assertLessEqual(
+            cast(float, self.threadless.select_timeout()),
+            proxy.Threadless.INACTIVITY_CHECK_INTERVAL)
+        self.assertEqual(housekeeping.call_count, 3)
+        housekeeping.assert_called_with()
+
+    def test_registrations_persist_across_iterations(self) -> None:
+        selector = self.selector
+        client, server = mock.MagicMock(), mock.MagicMock()
+        self.work.get_events.return_value = {client: selectors.EVENT_READ}
+
+        self.threadless.update_registrations()
+        self.threadless.dirty.add(10)
+        self.threadless.update_registrations()
+        selector.register.assert_called_once_with(client, selectors.EVENT_READ)
+        selector.modify.assert_not_called()
+        selector.unregister.assert_not_called()
+
+        self.work.get_events.return_value = {
+            client: selectors.EVENT_READ | selectors.EVENT_WRITE,
+            server: selectors.EVENT_READ,
+        }
+        self.threadless.dirty.add(10)
+        self.threadless.update_registrations()
+        selector.modify.assert_called_once_with(
+            client, selectors.EVENT_READ | selectors.EVENT_WRITE)
+        selector.register.assert_called_with(server, selectors.EVENT_READ)
+
+        self.work.get_events.return_value = {client: selectors.EVENT_READ}
+        self.threadless.dirty.add(10)
+        self.threadless.update_registrations()
+        selector.unregister.assert_called_once_with(server)
+
+    def test_cleanup_unregisters_work_descriptors(self) -> None:
+        selector = self.selector
+        client = mock.MagicMock()
+        self.work.get_events.return_value = {client: selectors.EVENT_READ}
+        self.threadless.update_registrations()
+
+        self.threadless.cleanup(10)
+
+        selector.unregister.assert_called_once_with(client)
+        self.work.shutdown.assert_called_once()
+        self.assertEqual(self.threadless.works, {})
+        self.assertEqual(self.threadless.registered, {})
+
+    @mock.patch('time.monotonic')
+    def test_cleanup_inactive_only_checks_due_works(self, mock_monotonic: mock.Mock) -> None:
+        inactive_work = mock.MagicMock()
+        inactive_work.is_inactive.return_value = True
+        self.work.is_inactive.return_value = False
+        self.threadless.works[11] = inactive_work
+        self.threadless.schedule_inactivity_check(10, 100.0)
+        self.threadless.schedule_inactivity_check(11, 100.5)
+
+        mock_monotonic.return_value = 100.9
+        self.threadless.cleanup_inactive()
+        self.work.is_inactive.assert_not_called()
+        inactive_work.is_inactive.assert_not_called()
+
+        mock_monotonic.return_value = 101.2
+        self.threadless.cleanup_inactive()
+        self.work.is_inactive.assert_called_once()
+        inactive_work.is_inactive.assert_not_called()
+
+        mock_monotonic.return_value = 101.6
+        self.threadless.cleanup_inactive()
+        inactive_work.shutdown.assert_called_once()
+        self.assertEqual(list(self.threadless.works), [10])
+        self.assertEqual(self.threadless.next_check, {10: 102.2})
+
+    def test_run_once_dispatches_ready_descriptors_to_their_works(self) -> None:
+        client, other_client, idle_client = mock.MagicMock(), mock.MagicMock(), mock.MagicMock()
+        teardown_work, idle_work = mock.MagicMock(), mock.MagicMock()
+        self.threadless.works[11] = teardown_work
+        self.threadless.works[12] = idle_work
+        self.threadless.dirty.update([11, 12])
+        self.work.get_events.return_value = {client: selectors.EVENT_READ}
+        teardown_work.get_events.return_value = {other_client: selectors.EVENT_WRITE}
+        idle_work.get_events.return_value = {idle_client: selectors.EVENT_READ}
+        self.work.handle_events.return_value = False
+        teardown_work.handle_events.return_value = True
+        for work in (self.work, idle_work):
+            work.is_inactive.return_value = False
+        self.selector.select.return_value = [
+            (mock.Mock(fileobj=client), selectors.EVENT_READ),
+            (mock.Mock(fileobj=other_client), selectors.EVENT_WRITE),
+        ]
+
+        self.threadless.run_once()
+
+        self.work.handle_events.assert_called_once_with([client], [])
+        teardown_work.handle_events.assert_called_once_with([], [other_client])
+        idle_work.handle_events.assert_not_called()
+        teardown_work.shutdown.assert_called_once()
+        self.work.shutdown.assert_not_called()
+        self.assertEqual(list(self.threadless.works), [10, 12])
+        self.assertNotIn(other_client, self.threadless.owners)
+
+    @mock.patch('time.monotonic')
+    def test_select_blocks_until_next_inactivity_check(self, mock_monotonic: mock.Mock) -> None:
+        self.threadless.works.clear()
+        self.threadless.dirty.clear()
+        self.selector.select.return_value = []
+        self.threadless.run_once()
+        self.selector.select.assert_called_with(timeout=None)
+
+        self.threadless.works[10] = self.work
+        self.work.is_inactive.return_value = False
+        self.threadless.schedule_inactivity_check(10, 100.0)
+        mock_monotonic.return_value = 100.75
+        with self.threadless.selected_events():
+            pass
+        self.selector.select.assert_called_with(timeout=0.25)
+
+    def test_only_dirty_works_are_asked_for_events(self) -> None:
+        idle_work = mock.MagicMock()
+        idle_work.is_inactive.return_value = False
+        self.threadless.works[11] = idle_work
+        self.threadless.dirty.add(11)
+        client, idle_client = mock.MagicMock(), mock.MagicMock()
+        self.work.get_events.return_value = {client: selectors.EVENT_READ}
+        idle_work.get_events.return_value = {idle_client: selectors.EVENT_READ}
+        self.work.handle_events.return_value = False
+        self.selector.select.return_value = []
+        self.threadless.run_once()
+        self.assertEqual(self.threadless.dirty, set())
+
+        self.selector.select.return_value = [
+            (mock.Mock(fileobj=client), selectors.EVENT_READ)]
+        self.threadless.run_once()
+        self.threadless.update_registrations()
+
+        self.assertEqual(self.work.get_events.call_count, 2)
+        idle_work.get_events.assert_called_once()
+
+
 class TestChunkParser(unittest.TestCase):
 
     def setUp(self) -> None:
@@ -451,6 +976,20 @@ class TestChunkParser(unittest.TestCase):
         self.assertEqual(self.parser.body, b'abcdefg')
         self.assertEqual(self.parser.state, proxy.chunkParserStates.COMPLETE)
 
+    def test_chunk_parse_trailing_crlf_received_with_next_chunk(self) -> None:
+        self.parser.parse(b'3\r\nabc')
+        self.assertEqual(self.parser.body, b'abc')
+        self.parser.parse(b'\r\n4\r\ndefg\r\n0\r\n\r\n')
+        self.assertEqual(self.parser.chunk, b'')
+        self.assertEqual(self.parser.size, None)
+        self.assertEqual(self.parser.body, b'abcdefg')
+        self.assertEqual(self.parser.state, proxy.chunkParserStates.COMPLETE)
+
+    def test_chunk_parse_ignores_chunk_extensions(self) -> None:
+        self.parser.parse(b'4;name=value\r\nWiki\r\n0\r\n\r\n')
+        self.assertEqual(self.parser.body, b'Wiki')
+        self.assertEqual(self.parser.state, proxy.chunkParserStates.COMPLETE)
+
     def test_to_chunks(self) -> None:
         self.assertEqual(b'f\r\n{"key":"value"}\r\n0\r\n\r\n', proxy.ChunkParser.to_chunks(b'{"key":"value"}'))
 
@@ -582,6 +1121,52 @@ class TestHttpParser(unittest.TestCase):
              b'example.com'),
             self.parser.build())
 
+    def test_connect_request_ipv6_authority(self) -> None:
+        self.parser.parse(b'CONNECT [::1]:8443 HTTP/1.1\r\n\r\n')
+        self.assertEqual(self.parser.host, b'::1')
+        self.assertEqual(self.parser.port, 8443)
+        self.assertEqual(self.parser.path, b'[::1]:8443')
+
+    def test_split_authority(self) -> None:
+        self.assertEqual(proxy.split_authority(b'PyPI.org:443'), (b'pypi.org', 443))
+        self.assertEqual(proxy.split_authority(b'pypi.org'), (b'pypi.org', None))
+        self.assertEqual(proxy.split_authority(b'[::1]'), (b'::1', None))
+        with self.assertRaises(ValueError):
+            proxy.split_authority(b'pypi.org:https')
+
+    def test_method_is_canonicalized(self) -> None:
+        self.parser.parse(b'connect python.org:443 HTTP/1.1' + proxy.CRLF)
+        self.assertIs(self.parser.method, proxy.httpMethods.CONNECT)
+
+    def test_build_with_disable_headers(self) -> None:
+        self.parser.parse(proxy.build_http_request(
+            b'GET', b'http://example.com/', headers={
+                b'Host': b'example.com',
+                b'X-Secret': b'hidden',
+            }))
+        config = proxy.ProtocolConfig(disable_headers=[b'X-Secret'])
+        self.assertEqual(config.disable_headers, frozenset([b'x-secret']))
+        self.assertEqual(
+            self.parser.build(disable_headers=config.disable_headers),
+            proxy.build_http_request(
+                b'GET', b'/', headers={b'Host': b'example.com'}))
+
+    def test_reset_allows_parser_reuse(self) -> None:
+        parser = proxy.HttpParser(proxy.httpParserTypes.RESPONSE_PARSER)
+        parser.parse(proxy.build_http_response(
+            proxy.httpStatusCodes.OK, reason=b'OK',
+            headers={b'X-First': b'1'}, body=b'first'))
+        self.assertEqual(parser.state, proxy.httpParserStates.COMPLETE)
+        parser.reset()
+        self.assertEqual(parser.state, proxy.httpParserStates.INITIALIZED)
+        self.assertEqual(parser.headers, {})
+        parser.parse(proxy.build_http_response(
+            proxy.httpStatusCodes.NOT_FOUND, reason=b'Not Found', body=b'second'))
+        self.assertEqual(parser.state, proxy.httpParserStates.COMPLETE)
+        self.assertEqual(parser.code, b'404')
+        self.assertEqual(parser.body, b'second')
+        self.assertFalse(parser.has_header(b'x-first'))
+
     def test_build_url_none(self) -> None:
         self.assertEqual(self.parser.build_url(), b'/None')
 
@@ -783,6 +1368,19 @@ class TestHttpParser(unittest.TestCase):
             self.parser.state,
             proxy.httpParserStates.HEADERS_COMPLETE)
 
+    def test_response_parse_without_content_length_with_body(self) -> None:
+        self.parser.type = proxy.httpParserTypes.RESPONSE_PARSER
+        self.parser.parse(proxy.CRLF.join([
+            b'HTTP/1.0 200 OK',
+            b'Server: BaseHTTP/0.3 Python/2.7.10',
+            b'',
+            b'<html></html>'
+        ]))
+        self.assertEqual(
+            self.parser.state,
+            proxy.httpParserStates.HEADERS_COMPLETE)
+        self.assertEqual(self.parser.buffer, b'<html></html>')
+
     def test_response_parse(self) -> None:
         self.parser.type = proxy.httpParserTypes.RESPONSE_PARSER
         self.parser.parse(b''.join([
@@ -984,6 +1582,42 @@ class TestWebsocketFrame(unittest.TestCase):
         self.assertEqual(frame.payload_length, 5)
         self.assertEqual(frame.data, b'hello')
 
+    def test_build_with_extended_payload_length(self) -> None:
+        for length, header in ((126, b'\x82\x7e\x00\x7e'), (1 << 16, b'\x82\x7f\x00\x00\x00\x00\x00\x01\x00\x00')):
+            frame = proxy.WebsocketFrame()
+            frame.fin = True
+            frame.opcode = proxy.websocketOpcodes.BINARY_FRAME
+            frame.data = b'x' * length
+            raw = frame.build()
+            self.assertEqual(raw, header + frame.data)
+            parsed = proxy.WebsocketFrame()
+            parsed.parse(raw)
+            self.assertEqual(parsed.payload_length, length)
+            self.assertEqual(parsed.data, frame.data)
+
+    def test_apply_mask(self) -> None:
+        for mask in (b'\xc6\ti\x8d', b'\x00' * 4, b'\x5a' * 4):
+            for data in (b'', b'\x00', b'hello', b'\xc6\ti\x8d' * 3, os.urandom(1027)):
+                self.assertEqual(
+                    proxy.WebsocketFrame.apply_mask(data, mask),
+                    bytes(b ^ mask[i % 4] for i, b in enumerate(data)))
+
+    def test_parse_at_walks_consecutive_frames(self) -> None:
+        frames = b'\x81\x85\xc6\ti\x8d\xael\x05\xe1\xa9' + b'\x82\x7e\x00\x7e' + b'x' * 126
+        frame = proxy.WebsocketFrame()
+        cur = frame.parse_at(frames)
+        self.assertEqual((cur, frame.data), (11, b'hello'))
+        frame.reset()
+        self.assertEqual(frame.parse_at(frames, cur), len(frames))
+        self.assertEqual(frame.data, b'x' * 126)
+
+    def test_parse_empty_masked_frame(self) -> None:
+        frame = proxy.WebsocketFrame()
+        self.assertEqual(frame.parse(b'\x89\x80\xc6\ti\x8dnext'), b'next')
+        self.assertEqual(frame.opcode, proxy.websocketOpcodes.PING)
+        self.assertEqual(frame.payload_length, 0)
+        self.assertEqual(frame.data, b'')
+
 
 class TestWebsocketClient(unittest.TestCase):
 
@@ -999,6 +1633,31 @@ class TestWebsocketClient(unittest.TestCase):
             proxy.build_websocket_handshake_request(key)
         )
 
+    @mock.patch('base64.b64encode')
+    @mock.patch('proxy.new_socket_connection')
+    def test_frames_split_across_reads(self, mock_connect: mock.Mock, mock_b64encode: mock.Mock) -> None:
+        key = b'MySecretKey'
+        mock_b64encode.return_value = key
+        mock_connect.return_value.recv.return_value = \
+            proxy.build_websocket_handshake_response(proxy.WebsocketFrame.key_to_accept(key))
+        received: List[Optional[bytes]] = []
+        client = proxy.WebsocketClient(
+            proxy.DEFAULT_IPV4_HOSTNAME, 8899,
+            on_message=lambda frame: received.append(frame.data))
+        client.selector = mock.MagicMock()
+        client.selector.select.return_value = [(None, selectors.EVENT_READ)]
+
+        frames = b'\x81\x85\xc6\ti\x8d\xael\x05\xe1\xa9' + b'\x82\x7e\x00\x7e' + b'x' * 126
+        # Second frame split within its extended header, then within its payload
+        with mock.patch.object(client, 'recv', side_effect=[frames[:13], frames[13:60], frames[60:]]):
+            client.run_once()
+            self.assertEqual(received, [b'hello'])
+            client.run_once()
+            self.assertEqual(received, [b'hello'])
+            client.run_once()
+        self.assertEqual(received, [b'hello', b'x' * 126])
+        self.assertEqual(client.pending, b'')
+
 
 class TestHttpProtocolHandler(unittest.TestCase):
 
@@ -1009,7 +1668,8 @@ class TestHttpProtocolHandler(unittest.TestCase):
               mock_selector: mock.Mock) -> None:
         self.fileno = 10
         self._addr = ('127.0.0.1', 54382)
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
+        self._conn.send.side_effect = lambda raw: len(raw)
 
         self.http_server_port = 65535
         self.config = proxy.ProtocolConfig()
@@ -1138,7 +1798,7 @@ class TestHttpProtocolHandler(unittest.TestCase):
             self,
             mock_fromfd: mock.Mock,
             mock_selector: mock.Mock) -> None:
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         self.mock_selector_for_client_read(mock_selector)
         config = proxy.ProtocolConfig(
             auth_code=b'Basic %s' %
@@ -1165,7 +1825,7 @@ class TestHttpProtocolHandler(unittest.TestCase):
             self, mock_server_connection: mock.Mock,
             mock_fromfd: mock.Mock,
             mock_selector: mock.Mock) -> None:
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         self.mock_selector_for_client_read(mock_selector)
 
         server = mock_server_connection.return_value
@@ -1216,7 +1876,8 @@ class TestHttpProtocolHandler(unittest.TestCase):
         server = mock_server_connection.return_value
         server.connect.return_value = True
         server.buffer_size.return_value = 0
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
+        self._conn.send.side_effect = lambda raw: len(raw)
         self.mock_selector_for_client_read_read_server_write(mock_selector, server)
 
         config = proxy.ProtocolConfig(
@@ -1245,6 +1906,88 @@ class TestHttpProtocolHandler(unittest.TestCase):
         self.proxy.run_once()
         server.flush.assert_called_once()
 
+    def test_set_wakeup_is_attached_to_client(self) -> None:
+        wakeup = mock.Mock()
+        self.proxy.set_wakeup(wakeup)
+        self.assertIs(self.proxy.client.wakeup, wakeup)
+
+    def test_no_op_plugin_hooks_are_skipped(self) -> None:
+        self.assertEqual(
+            [plugin.name() for plugin in self.proxy.ordered_plugins],
+            ['HttpProxyPlugin', 'HttpWebServerPlugin'])
+        self.assertEqual(
+            [plugin.name() for plugin in self.proxy.descriptor_plugins],
+            ['HttpProxyPlugin'])
+        self.assertEqual(self.proxy.response_chunk_plugins, ())
+
+    def test_subclass_overriding_descriptor_methods_is_not_skipped(self) -> None:
+        class DescriptorWebServerPlugin(proxy.HttpWebServerPlugin):
+            def get_descriptors(self) -> Tuple[List[socket.socket], List[socket.socket]]:
+                return [], []
+
+        class QuietWebServerPlugin(proxy.HttpWebServerPlugin):
+            pass
+
+        self.assertTrue(DescriptorWebServerPlugin.HAS_DESCRIPTORS)
+        self.assertFalse(QuietWebServerPlugin.HAS_DESCRIPTORS)
+        self.assertFalse(proxy.HttpWebServerPlugin.HAS_DESCRIPTORS)
+
+        self.config.plugins[b'ProtocolHandlerPlugin'].append(DescriptorWebServerPlugin)
+        self.proxy.initialize()
+        self.assertEqual(
+            [plugin.name() for plugin in self.proxy.descriptor_plugins],
+            ['HttpProxyPlugin', 'DescriptorWebServerPlugin'])
+
+    def test_subclass_overriding_response_chunk_hook_is_called(self) -> None:
+        chunks: List[bytes] = []
+
+        class RecordingProxyPlugin(proxy.HttpProxyPlugin):
+            def on_response_chunk(self, chunk: bytes) -> bytes:
+                chunks.append(bytes(chunk))
+                return chunk
+
+        self.assertTrue(RecordingProxyPlugin.HAS_RESPONSE_CHUNK_HOOK)
+        self.assertFalse(proxy.HttpProxyPlugin.HAS_RESPONSE_CHUNK_HOOK)
+
+        self.config.plugins[b'ProtocolHandlerPlugin'] = [RecordingProxyPlugin]
+        self.proxy.initialize()
+        self.assertEqual(
+            [plugin.name() for plugin in self.proxy.response_chunk_plugins],
+            ['RecordingProxyPlugin'])
+
+        self.proxy.client.queue(b'chunk')
+        self.proxy.handle_writables([self._conn])
+        self.assertEqual(chunks, [b'chunk'])
+
+    def test_get_events_merges_plugin_descriptors(self) -> None:
+        server, other = mock.MagicMock(), mock.MagicMock()
+        plugin = mock.MagicMock()
+        plugin.get_descriptors.return_value = ([server, other], [server, self._conn])
+        self.proxy.descriptor_plugins = (plugin,)
+        self.assertEqual(self.proxy.get_events(), {
+            self._conn: selectors.EVENT_READ | selectors.EVENT_WRITE,
+            server: selectors.EVENT_READ | selectors.EVENT_WRITE,
+            other: selectors.EVENT_READ,
+        })
+
+    def test_selector_registrations_persist_across_iterations(self) -> None:
+        selector = self.mock_selector.return_value
+        selector.select.return_value = []
+        self.proxy.run_once()
+        self.proxy.run_once()
+        selector.register.assert_called_once_with(
+            self._conn, selectors.EVENT_READ)
+        selector.modify.assert_not_called()
+        selector.unregister.assert_not_called()
+
+        self.proxy.client.queue(b'HTTP/1.1 200 OK' + proxy.CRLF)
+        self.proxy.run_once()
+        selector.modify.assert_called_once_with(
+            self._conn, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+        self.proxy.update_registrations({})
+        selector.unregister.assert_called_once_with(self._conn)
+
     def mock_selector_for_client_read_read_server_write(self, mock_selector: mock.Mock, server: mock.Mock) -> None:
         mock_selector.return_value.select.side_effect = [
             [(selectors.SelectorKey(
@@ -1325,7 +2068,7 @@ class TestWebServerPlugin(unittest.TestCase):
     def setUp(self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
         self.fileno = 10
         self._addr = ('127.0.0.1', 54382)
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         self.mock_selector = mock_selector
         self.config = proxy.ProtocolConfig()
         self.config.plugins = proxy.load_plugins(
@@ -1339,7 +2082,7 @@ class TestWebServerPlugin(unittest.TestCase):
     def test_pac_file_served_from_disk(
             self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
         pac_file = 'proxy.pac'
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         self.mock_selector_for_client_read(mock_selector)
         self.init_and_make_pac_file_request(pac_file)
         self.proxy.run_once()
@@ -1358,7 +2101,7 @@ class TestWebServerPlugin(unittest.TestCase):
     @mock.patch('socket.fromfd')
     def test_pac_file_served_from_buffer(
             self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         self.mock_selector_for_client_read(mock_selector)
         pac_file_content = b'function FindProxyForURL(url, host) { return "PROXY localhost:8899; DIRECT"; }'
         self.init_and_make_pac_file_request(proxy.text_(pac_file_content))
@@ -1377,7 +2120,7 @@ class TestWebServerPlugin(unittest.TestCase):
     @mock.patch('socket.fromfd')
     def test_default_web_server_returns_404(
             self, mock_fromfd: mock.Mock, mock_selector: mock.Mock) -> None:
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         mock_selector.return_value.select.return_value = [(
             selectors.SelectorKey(
                 fileobj=self._conn,
@@ -1419,7 +2162,8 @@ class TestWebServerPlugin(unittest.TestCase):
         with open(index_file_path, 'wb') as f:
             f.write(html_file_content)
 
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
+        self._conn.send.side_effect = lambda raw: len(raw)
         self._conn.recv.return_value = proxy.build_http_request(b'GET', b'/index.html')
 
         mock_selector.return_value.select.side_effect = [
@@ -1457,13 +2201,63 @@ class TestWebServerPlugin(unittest.TestCase):
             body=html_file_content
         ))
 
+    @mock.patch.object(proxy.HttpWebServerPlugin, 'static_responses', {})
+    @mock.patch.object(proxy.HttpWebServerPlugin, 'static_responses_size', 0)
+    def test_static_file_responses_are_cached_until_file_changes(self) -> None:
+        client = mock.MagicMock()
+        plugin = proxy.HttpWebServerPlugin(
+            proxy.ProtocolConfig(), client, proxy.HttpParser(proxy.httpParserTypes.REQUEST_PARSER))
+        with tempfile.TemporaryDirectory() as static_server_dir:
+            path = os.path.join(static_server_dir, 'app.js')
+            with open(path, 'wb') as f:
+                f.write(b'v1')
+            with mock.patch('builtins.open', wraps=open) as mock_open:
+                self.assertFalse(plugin.serve_file_or_404(path))
+                self.assertFalse(plugin.serve_file_or_404(path))
+                self.assertEqual([c[0][0] for c in mock_open.call_args_list].count(path), 1)
+            self.assertEqual(client.queue.call_args_list[0], client.queue.call_args_list[1])
+
+            with open(path, 'wb') as f:
+                f.write(b'v2!')
+            self.assertFalse(plugin.serve_file_or_404(path))
+            self.assertTrue(client.queue.call_args[0][0].endswith(b'v2!'))
+
+            self.assertTrue(plugin.serve_file_or_404(static_server_dir))
+            client.queue.assert_called_with(proxy.HttpWebServerPlugin.DEFAULT_404_RESPONSE)
+
+    @mock.patch.object(proxy.HttpWebServerPlugin, 'static_responses', {})
+    @mock.patch.object(proxy.HttpWebServerPlugin, 'static_responses_size', 0)
+    @mock.patch.object(proxy.HttpWebServerPlugin, 'MAX_STATIC_RESPONSES_SIZE', 150)
+    def test_static_file_responses_cache_is_bounded_by_size(self) -> None:
+        plugin = proxy.HttpWebServerPlugin(
+            proxy.ProtocolConfig(), mock.MagicMock(), proxy.HttpParser(proxy.httpParserTypes.REQUEST_PARSER))
+        with tempfile.TemporaryDirectory() as static_server_dir:
+            paths = [os.path.join(static_server_dir, name) for name in ('a', 'b', 'c')]
+            for path in paths:
+                with open(path, 'wb') as f:
+                    f.write(b'x')
+                self.assertFalse(plugin.serve_file_or_404(path))
+            cached = proxy.HttpWebServerPlugin.static_responses
+            self.assertEqual(list(cached), paths[1:])
+            self.assertEqual(
+                proxy.HttpWebServerPlugin.static_responses_size,
+                sum(len(response) for _, _, response in cached.values()))
+            self.assertLessEqual(proxy.HttpWebServerPlugin.static_responses_size, 150)
+
+            with open(paths[2], 'wb') as f:
+                f.write(b'x' * (proxy.HttpWebServerPlugin.MAX_STATIC_RESPONSE_FILE_SIZE + 1))
+            self.assertFalse(plugin.serve_file_or_404(paths[2]))
+            self.assertEqual(list(cached), paths[1:2])
+            self.assertEqual(proxy.HttpWebServerPlugin.static_responses_size, len(cached[paths[1]][2]))
+
     @mock.patch('selectors.DefaultSelector')
     @mock.patch('socket.fromfd')
     def test_static_web_server_serves_404(
             self,
             mock_fromfd: mock.Mock,
             mock_selector: mock.Mock) -> None:
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
+        self._conn.send.side_effect = lambda raw: len(raw)
         self._conn.recv.return_value = proxy.build_http_request(b'GET', b'/not-found.html')
 
         mock_selector.return_value.select.side_effect = [
@@ -1500,7 +2294,7 @@ class TestWebServerPlugin(unittest.TestCase):
         config = proxy.ProtocolConfig()
         plugin = mock.MagicMock()
         config.plugins = {b'ProtocolHandlerPlugin': [plugin]}
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         self.proxy = proxy.ProtocolHandler(
             self.fileno, self._addr, config=config)
         self.proxy.initialize()
@@ -1511,6 +2305,29 @@ class TestWebServerPlugin(unittest.TestCase):
         self.assertTrue(self._conn.closed)
         plugin.return_value.on_client_connection_close.assert_called()
 
+    def test_websocket_frames_parsed_with_reused_frame(self) -> None:
+        plugin = cast(proxy.HttpWebServerPlugin, self.proxy.plugins['HttpWebServerPlugin'])
+        plugin.switched_protocol = proxy.httpProtocolTypes.WEBSOCKET
+        plugin.route = mock.MagicMock()
+        received = []
+        plugin.route.on_websocket_message.side_effect = \
+            lambda frame: received.append((frame, frame.data))
+
+        raw = b''
+        for data in (b'hello', b'world'):
+            frame = proxy.WebsocketFrame()
+            frame.fin = True
+            frame.opcode = proxy.websocketOpcodes.TEXT_FRAME
+            frame.masked = True
+            frame.mask = b'\x01\x02\x03\x04'
+            frame.data = data
+            raw += frame.build()
+        self.assertIsNone(plugin.on_client_data(raw))
+        self.assertEqual(received, [
+            (plugin.websocket_frame, b'hello'),
+            (plugin.websocket_frame, b'world'),
+        ])
+
     def init_and_make_pac_file_request(self, pac_file: str) -> None:
         config = proxy.ProtocolConfig(pac_file=pac_file)
         config.plugins = proxy.load_plugins(
@@ -1532,6 +2349,94 @@ class TestWebServerPlugin(unittest.TestCase):
                 data=None), selectors.EVENT_READ), ]
 
 
+class TestDevtoolsWebsocketPlugin(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.client = mock.MagicMock()
+        self.plugin = proxy.DevtoolsWebsocketPlugin(proxy.ProtocolConfig(), self.client)
+
+    def response(self, method: str, message_id: Any) -> Dict[str, Any]:
+        self.plugin.handle_message({'id': message_id, 'method': method})
+        frame = proxy.WebsocketFrame()
+        frame.parse(self.client.queue.call_args[0][0])
+        assert frame.data is not None
+        return cast(Dict[str, Any], json.loads(frame.data))
+
+    def test_handle_message(self) -> None:
+        self.assertEqual(
+            self.response('Page.canScreencast', 7),
+            {'id': 7, 'result': False})
+        self.assertEqual(
+            self.response('Network.getResponseBody', 8),
+            {'id': 8, 'result': {'body': '', 'base64Encoded': False}})
+        self.assertEqual(
+            self.response('Page.getResourceTree', 9)['result']['frameTree']['frame']['url'],
+            'http://proxypy')
+        self.assertEqual(
+            self.response('Network.enable', 'some-id'),
+            {'id': 'some-id', 'result': {}})
+
+    def test_event_dispatcher_batches_queued_events(self) -> None:
+        shutdown = threading.Event()
+        events: proxy.DevtoolsEventQueueType = queue.Queue()
+        events.put([{'method': 'Network.requestWillBeSent', 'params': {'i': 0}}])
+        events.put([{'method': 'Network.dataReceived', 'params': {'i': i}} for i in (1, 2)])
+        self.client.queue.side_effect = lambda raw: shutdown.set()
+        proxy.DevtoolsWebsocketPlugin.event_dispatcher(shutdown, events, self.client)
+
+        self.client.queue.assert_called_once()
+        cast(mock.Mock, self.client.wakeup).assert_called_once_with()
+        raw = self.client.queue.call_args[0][0]
+        received = []
+        while raw:
+            frame = proxy.WebsocketFrame()
+            raw = frame.parse(raw)
+            assert frame.data is not None
+            received.append(json.loads(frame.data)['params']['i'])
+        self.assertEqual(received, [0, 1, 2])
+
+
+class TestDevtoolsProtocolPlugin(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.events: proxy.DevtoolsEventQueueType = queue.Queue()
+        config = proxy.ProtocolConfig()
+        config.devtools_event_queue = self.events
+        request = proxy.HttpParser(proxy.httpParserTypes.REQUEST_PARSER)
+        request.parse(proxy.build_http_request(b'GET', b'http://localhost:8080/'))
+        self.plugin = proxy.DevtoolsProtocolPlugin(config, mock.MagicMock(), request)
+
+    def emitted(self) -> List[str]:
+        """Returns methods of events emitted with a single put since last call."""
+        evs = self.events.get_nowait()
+        self.assertTrue(self.events.empty())
+        return [ev['method'] for ev in evs]
+
+    def test_request_ids_are_unique(self) -> None:
+        other = proxy.DevtoolsProtocolPlugin(
+            self.plugin.config, mock.MagicMock(), self.plugin.request)
+        self.assertNotEqual(self.plugin.id, other.id)
+        self.assertTrue(other.id.startswith('%d-' % os.getpid()))
+
+    def test_request_will_be_sent_decodes_headers(self) -> None:
+        self.plugin.request.add_header(b'X-Test', b'value')
+        self.assertEqual(
+            self.plugin.request_will_be_sent()['request']['headers'],
+            {'X-Test': 'value'})
+
+    def test_response_events_are_emitted_once(self) -> None:
+        self.plugin.on_response_chunk(proxy.CRLF.join([
+            b'HTTP/1.1 200 OK',
+            b'Content-Length: 6',
+            proxy.CRLF,
+        ]))
+        self.assertEqual(self.emitted(), ['Network.responseReceived'])
+        self.plugin.on_response_chunk(b'abc')
+        self.assertEqual(self.emitted(), ['Network.dataReceived'])
+        self.plugin.on_response_chunk(b'def')
+        self.assertEqual(self.emitted(), ['Network.dataReceived', 'Network.loadingFinished'])
+
+
 class TestHttpProxyPlugin(unittest.TestCase):
 
     @mock.patch('selectors.DefaultSelector')
@@ -1550,7 +2455,7 @@ class TestHttpProxyPlugin(unittest.TestCase):
             b'ProtocolHandlerPlugin': [proxy.HttpProxyPlugin],
             b'HttpProxyBasePlugin': [self.plugin]
         }
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         self.proxy = proxy.ProtocolHandler(
             self.fileno, self._addr, config=self.config)
         self.proxy.initialize()
@@ -1604,6 +2509,189 @@ class TestHttpProxyPlugin(unittest.TestCase):
         self.plugin.return_value.before_upstream_connection.assert_called()
         mock_server_conn.assert_not_called()
 
+    def new_connect_tunnel(
+            self, config: proxy.ProtocolConfig) -> Tuple[proxy.HttpProxyPlugin, mock.MagicMock]:
+        request = proxy.HttpParser.request(b'CONNECT upstream.host:443 HTTP/1.1\r\n\r\n')
+        plugin = proxy.HttpProxyPlugin(config, mock.MagicMock(), request)
+        server = mock.MagicMock()
+        server.closed = False
+        server.can_splice_to.return_value = True
+        plugin.server = server
+        return plugin, server
+
+    def test_connect_tunnel_splices_upstream_data(self) -> None:
+        plugin, server = self.new_connect_tunnel(proxy.ProtocolConfig())
+        server.splice_to.return_value = 1024
+
+        self.assertFalse(plugin.read_from_descriptors([server.connection]))
+        server.splice_to.assert_called_once_with(
+            plugin.client, proxy.DEFAULT_SERVER_RECVBUF_SIZE)
+        server.recv.assert_not_called()
+        self.assertEqual(plugin.response.total_size, 1024)
+
+        server.splice_to.return_value = None
+        self.assertTrue(plugin.read_from_descriptors([server.connection]))
+
+    def test_connect_tunnel_not_spliced_with_proxy_plugins(self) -> None:
+        plugin, server = self.new_connect_tunnel(self.config)
+        server.recv.return_value = b'data'
+        self.plugin.return_value.handle_upstream_chunk.side_effect = lambda chunk: chunk
+
+        self.assertFalse(plugin.read_from_descriptors([server.connection]))
+        server.splice_to.assert_not_called()
+        self.plugin.return_value.handle_upstream_chunk.assert_called_once_with(b'data')
+        cast(mock.Mock, plugin.client.queue).assert_called_once_with(b'data')
+
+    def new_upstream_exchange(
+            self,
+            response: bytes,
+            enable_upstream_keep_alive: bool = True) -> Tuple[proxy.HttpProxyPlugin, mock.MagicMock]:
+        request = proxy.HttpParser.request(
+            b'GET http://upstream.host/ HTTP/1.1\r\nHost: upstream.host\r\n\r\n')
+        plugin = proxy.HttpProxyPlugin(
+            proxy.ProtocolConfig(enable_upstream_keep_alive=enable_upstream_keep_alive),
+            mock.MagicMock(), request)
+        server = mock.MagicMock()
+        server.addr = ('upstream.host', 80)
+        server.closed = False
+        server.has_buffer.return_value = False
+        server.connection.recv.side_effect = BlockingIOError
+        plugin.server = server
+        plugin.upstream_requests = 1
+        plugin.response.parse(response)
+        return plugin, server
+
+    @mock.patch.object(proxy.HttpProxyPlugin, 'idle_upstream_connections', [])
+    @mock.patch('proxy.TcpServerConnection')
+    def test_keep_alive_upstream_connection_is_reused(self, mock_server_conn: mock.Mock) -> None:
+        plugin, server = self.new_upstream_exchange(
+            b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+        plugin.on_client_connection_close()
+        server.close.assert_not_called()
+
+        next_plugin, _ = self.new_upstream_exchange(b'')
+        next_plugin.connect_upstream()
+        self.assertIs(next_plugin.server, server)
+        server.connection.recv.assert_called_once_with(1, socket.MSG_PEEK)
+        mock_server_conn.assert_not_called()
+
+        # Parked connection closed by upstream is discarded
+        plugin.on_client_connection_close()
+        server.connection.recv.side_effect = None
+        server.connection.recv.return_value = b''
+        next_plugin.connect_upstream()
+        server.close.assert_called_once()
+        self.assertIs(next_plugin.server, mock_server_conn.return_value)
+
+    @mock.patch.object(proxy.HttpProxyPlugin, 'idle_upstream_connections', [])
+    def test_upstream_connection_not_reused_after_incomplete_exchange(self) -> None:
+        for response in (
+                b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\nConnection: close\r\n\r\nok',
+                b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\no',
+                b'HTTP/1.0 200 OK\r\nContent-Length: 2\r\n\r\nok'):
+            plugin, server = self.new_upstream_exchange(response)
+            plugin.on_client_connection_close()
+            server.close.assert_called_once()
+        self.assertEqual(proxy.HttpProxyPlugin.idle_upstream_connections, [])
+
+    @mock.patch.object(proxy.HttpProxyPlugin, 'idle_upstream_connections', [])
+    @mock.patch('proxy.TcpServerConnection')
+    def test_upstream_keep_alive_disabled_by_default(self, mock_server_conn: mock.Mock) -> None:
+        plugin, server = self.new_upstream_exchange(
+            b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok',
+            enable_upstream_keep_alive=proxy.DEFAULT_ENABLE_UPSTREAM_KEEP_ALIVE)
+        plugin.on_client_connection_close()
+        server.close.assert_called_once()
+        self.assertEqual(proxy.HttpProxyPlugin.idle_upstream_connections, [])
+
+    @mock.patch.object(proxy.HttpProxyPlugin, 'idle_upstream_connections', [])
+    @mock.patch('proxy.TcpServerConnection')
+    def test_server_closed_upstream_connection_is_discarded(self, mock_server_conn: mock.Mock) -> None:
+        plugin, server = self.new_upstream_exchange(
+            b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+        plugin.on_client_connection_close()
+        # Upstream closed parked connection, MSG_PEEK reads EOF
+        server.connection.recv.side_effect = None
+        server.connection.recv.return_value = b''
+
+        next_plugin, _ = self.new_upstream_exchange(b'')
+        next_plugin.connect_upstream()
+
+        server.connection.recv.assert_called_once_with(1, socket.MSG_PEEK)
+        server.close.assert_called_once()
+        self.assertIs(next_plugin.server, mock_server_conn.return_value)
+        mock_server_conn.return_value.connect.assert_called_once()
+        self.assertEqual(proxy.HttpProxyPlugin.idle_upstream_connections, [])
+
+    @mock.patch.object(proxy.HttpProxyPlugin, 'idle_upstream_connections', [])
+    @mock.patch('time.monotonic')
+    def test_expired_upstream_connections_are_reaped(self, mock_monotonic: mock.Mock) -> None:
+        mock_monotonic.return_value = 100.0
+        plugin, server = self.new_upstream_exchange(
+            b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+        plugin.on_client_connection_close()
+
+        mock_monotonic.return_value = 103.0
+        self.assertEqual(
+            proxy.HttpProxyPlugin.reap_idle_upstream_connections(),
+            proxy.HttpProxyPlugin.IDLE_UPSTREAM_TIMEOUT - 3.0)
+        server.close.assert_not_called()
+
+        mock_monotonic.return_value = 100.0 + proxy.HttpProxyPlugin.IDLE_UPSTREAM_TIMEOUT
+        self.assertIsNone(proxy.HttpProxyPlugin.reap_idle_upstream_connections())
+        server.close.assert_called_once()
+        self.assertEqual(proxy.HttpProxyPlugin.idle_upstream_connections, [])
+
+    @mock.patch.object(proxy.HttpProxyPlugin, 'reap_idle_upstream_connections')
+    def test_housekeeping_reaps_only_with_upstream_keep_alive(self, mock_reap: mock.Mock) -> None:
+        mock_reap.return_value = 2.5
+        plugins: Dict[bytes, List[type]] = {b'ProtocolHandlerPlugin': [proxy.HttpProxyPlugin]}
+        self.assertIsNone(proxy.ProtocolHandler.housekeeping(
+            config=proxy.ProtocolConfig(plugins=plugins)))
+        mock_reap.assert_not_called()
+        self.assertEqual(proxy.ProtocolHandler.housekeeping(
+            config=proxy.ProtocolConfig(plugins=plugins, enable_upstream_keep_alive=True)), 2.5)
+        mock_reap.assert_called_once_with()
+
+    @mock.patch('subprocess.Popen')
+    def test_generate_upstream_certificate_publishes_complete_file(self, mock_popen: mock.Mock) -> None:
+        with tempfile.TemporaryDirectory() as ca_cert_dir:
+            plugin, _ = self.new_connect_tunnel(proxy.ProtocolConfig(
+                ca_cert_dir=ca_cert_dir, ca_cert_file='ca-cert.pem',
+                ca_key_file='ca-key.pem', ca_signing_key_file='signing-key.pem'))
+            cert_file_path = os.path.join(ca_cert_dir, 'upstream.host.pem')
+
+            def sign(*args: Any, **kwargs: Any) -> Tuple[bytes, bytes]:
+                with open(mock_popen.call_args[0][0][-1], 'wb') as f:
+                    f.write(b'cert')
+                return b'', b''
+            mock_popen.return_value.communicate.side_effect = sign
+            mock_popen.return_value.returncode = 1
+            self.assertEqual(plugin.generate_upstream_certificate(None), cert_file_path)
+            self.assertFalse(os.path.exists(cert_file_path))
+            # Output of failed signing is not left behind
+            self.assertEqual(os.listdir(ca_cert_dir), [])
+
+            def sign_timeout(*args: Any, **kwargs: Any) -> Tuple[bytes, bytes]:
+                sign()
+                raise subprocess.TimeoutExpired('openssl', 10)
+            mock_popen.return_value.communicate.side_effect = sign_timeout
+            with self.assertRaises(subprocess.TimeoutExpired):
+                plugin.generate_upstream_certificate(None)
+            self.assertEqual(os.listdir(ca_cert_dir), [])
+            mock_popen.return_value.communicate.side_effect = sign
+
+            # Context loaded from a previous certificate at same path
+            stale_context = mock.MagicMock(spec=ssl.SSLContext)
+            plugin.config._interception_ssl_contexts[cert_file_path] = stale_context
+            mock_popen.return_value.returncode = 0
+            plugin.generate_upstream_certificate(None)
+            self.assertNotIn(cert_file_path, plugin.config._interception_ssl_contexts)
+            plugin.generate_upstream_certificate(None)
+            self.assertEqual(mock_popen.call_count, 6)
+            with open(cert_file_path, 'rb') as f:
+                self.assertEqual(f.read(), b'cert')
+
 
 class TestHttpProxyPluginExamples(unittest.TestCase):
 
@@ -1626,7 +2714,7 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
             b'ProtocolHandlerPlugin': [proxy.HttpProxyPlugin],
             b'HttpProxyBasePlugin': [plugin],
         }
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
         self.proxy = proxy.ProtocolHandler(
             self.fileno, self._addr, config=self.config)
         self.proxy.initialize()
@@ -1829,7 +2917,7 @@ class TestHttpProxyPluginExamples(unittest.TestCase):
 
 class TestHttpProxyTlsInterception(unittest.TestCase):
 
-    @mock.patch('ssl.wrap_socket')
+    @mock.patch('ssl.SSLContext')
     @mock.patch('ssl.create_default_context')
     @mock.patch('proxy.TcpServerConnection')
     @mock.patch('subprocess.Popen')
@@ -1842,7 +2930,7 @@ class TestHttpProxyTlsInterception(unittest.TestCase):
             mock_popen: mock.Mock,
             mock_server_conn: mock.Mock,
             mock_ssl_context: mock.Mock,
-            mock_ssl_wrap: mock.Mock) -> None:
+            mock_interception_ssl_context: mock.Mock) -> None:
         host, port = uuid.uuid4().hex, 443
         netloc = '{0}:{1}'.format(host, port)
 
@@ -1851,11 +2939,11 @@ class TestHttpProxyTlsInterception(unittest.TestCase):
         self.mock_popen = mock_popen
         self.mock_server_conn = mock_server_conn
         self.mock_ssl_context = mock_ssl_context
-        self.mock_ssl_wrap = mock_ssl_wrap
+        self.mock_interception_ssl_context = mock_interception_ssl_context
 
         ssl_connection = mock.MagicMock(spec=ssl.SSLSocket)
         self.mock_ssl_context.return_value.wrap_socket.return_value = ssl_connection
-        self.mock_ssl_wrap.return_value = mock.MagicMock(spec=ssl.SSLSocket)
+        self.mock_interception_ssl_context.return_value.wrap_socket.return_value = mock.MagicMock(spec=ssl.SSLSocket)
         plain_connection = mock.MagicMock(spec=socket.socket)
 
         def mock_connection() -> Any:
@@ -1879,7 +2967,8 @@ class TestHttpProxyTlsInterception(unittest.TestCase):
             b'ProtocolHandlerPlugin': [self.plugin, proxy.HttpProxyPlugin],
             b'HttpProxyBasePlugin': [self.proxy_plugin],
         }
-        self._conn = mock_fromfd.return_value
+        self._conn = recv_into_from_recv(mock_fromfd.return_value)
+        self._conn.send.side_effect = lambda raw: len(raw)
         self.proxy = proxy.ProtocolHandler(
             self.fileno, self._addr, config=self.config)
         self.proxy.initialize()
@@ -1943,24 +3032,55 @@ class TestHttpProxyTlsInterception(unittest.TestCase):
         self.assertEqual(self.mock_server_conn.return_value._conn, ssl_connection)
         self._conn.send.assert_called_with(proxy.HttpProxyPlugin.PROXY_TUNNEL_ESTABLISHED_RESPONSE_PKT)
         assert self.config.ca_cert_dir is not None
-        self.mock_ssl_wrap.assert_called_with(
-            self._conn,
-            server_side=True,
-            keyfile=self.config.ca_signing_key_file,
+        self.mock_interception_ssl_context.assert_called_once_with(ssl.PROTOCOL_TLS_SERVER)
+        interception_ssl_context = self.mock_interception_ssl_context.return_value
+        interception_ssl_context.load_cert_chain.assert_called_once_with(
             certfile=proxy.HttpProxyPlugin.generated_cert_file_path(
-                self.config.ca_cert_dir, host)
-        )
+                self.config.ca_cert_dir, host),
+            keyfile=self.config.ca_signing_key_file)
+        interception_ssl_context.wrap_socket.assert_called_with(self._conn, server_side=True)
         self.assertEqual(self._conn.setblocking.call_count, 2)
-        self.assertEqual(self.proxy.client.connection, self.mock_ssl_wrap.return_value)
+        client_ssl_connection = interception_ssl_context.wrap_socket.return_value
+        self.assertEqual(self.proxy.client.connection, client_ssl_connection)
 
         # Assert connection references for all other plugins is updated
-        self.assertEqual(self.plugin.return_value.client._conn, self.mock_ssl_wrap.return_value)
-        self.assertEqual(self.proxy_plugin.return_value.client._conn, self.mock_ssl_wrap.return_value)
+        self.assertEqual(self.plugin.return_value.client._conn, client_ssl_connection)
+        self.assertEqual(self.proxy_plugin.return_value.client._conn, client_ssl_connection)
+
+    @mock.patch('ssl.SSLContext')
+    @mock.patch('ssl.create_default_context')
+    def test_ssl_contexts_are_reused(
+            self,
+            mock_ssl_context: mock.Mock,
+            mock_interception_ssl_context: mock.Mock) -> None:
+        config = proxy.ProtocolConfig(ca_signing_key_file='ca-signing-key.pem')
+        self.assertIs(config.upstream_ssl_context(), config.upstream_ssl_context())
+        mock_ssl_context.assert_called_once_with(ssl.Purpose.SERVER_AUTH)
+
+        with mock.patch.object(proxy.ProtocolConfig, 'MAX_INTERCEPTION_SSL_CONTEXTS', 2):
+            for certfile in ('a.pem', 'a.pem', 'b.pem', 'c.pem', 'c.pem', 'a.pem'):
+                config.interception_ssl_context(certfile)
+            config.discard_interception_ssl_context('a.pem')
+            config.interception_ssl_context('a.pem')
+        self.assertEqual(
+            [c[1]['certfile'] for c in mock_interception_ssl_context.return_value.load_cert_chain.call_args_list],
+            ['a.pem', 'b.pem', 'c.pem', 'a.pem', 'a.pem'])
+
+    def test_config_with_warm_ssl_contexts_can_be_pickled(self) -> None:
+        config = proxy.ProtocolConfig(
+            ca_cert_file='ca-cert.pem',
+            ca_key_file='ca-key.pem',
+            ca_signing_key_file='ca-signing-key.pem')
+        config.warm_ssl_contexts()
+        upstream_ssl_context = config.upstream_ssl_context()
+        unpickled = pickle.loads(pickle.dumps(config))
+        self.assertIsNot(unpickled.upstream_ssl_context(), upstream_ssl_context)
+        self.assertIs(config.upstream_ssl_context(), upstream_ssl_context)
 
 
 class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
 
-    @mock.patch('ssl.wrap_socket')
+    @mock.patch('ssl.SSLContext')
     @mock.patch('ssl.create_default_context')
     @mock.patch('proxy.TcpServerConnection')
     @mock.patch('subprocess.Popen')
@@ -1972,13 +3092,13 @@ class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
               mock_popen: mock.Mock,
               mock_server_conn: mock.Mock,
               mock_ssl_context: mock.Mock,
-              mock_ssl_wrap: mock.Mock) -> None:
+              mock_interception_ssl_context: mock.Mock) -> None:
         self.mock_fromfd = mock_fromfd
         self.mock_selector = mock_selector
         self.mock_popen = mock_popen
         self.mock_server_conn = mock_server_conn
         self.mock_ssl_context = mock_ssl_context
-        self.mock_ssl_wrap = mock_ssl_wrap
+        self.mock_interception_ssl_context = mock_interception_ssl_context
 
         self.fileno = 10
         self._addr = ('127.0.0.1', 54382)
@@ -1994,7 +3114,7 @@ class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
             b'ProtocolHandlerPlugin': [proxy.HttpProxyPlugin],
             b'HttpProxyBasePlugin': [plugin],
         }
-        self._conn = mock.MagicMock(spec=socket.socket)
+        self._conn = recv_into_from_recv(mock.MagicMock(spec=socket.socket))
         mock_fromfd.return_value = self._conn
         self.proxy = proxy.ProtocolHandler(
             self.fileno, self._addr, config=self.config)
@@ -2004,8 +3124,8 @@ class TestHttpProxyPluginExamplesWithTlsInterception(unittest.TestCase):
 
         self.server_ssl_connection = mock.MagicMock(spec=ssl.SSLSocket)
         self.mock_ssl_context.return_value.wrap_socket.return_value = self.server_ssl_connection
-        self.client_ssl_connection = mock.MagicMock(spec=ssl.SSLSocket)
-        self.mock_ssl_wrap.return_value = self.client_ssl_connection
+        self.client_ssl_connection = recv_into_from_recv(mock.MagicMock(spec=ssl.SSLSocket))
+        self.mock_interception_ssl_context.return_value.wrap_socket.return_value = self.client_ssl_connection
 
         def has_buffer() -> bool:
             return cast(bool, self.server.queue.called)
@@ -2139,6 +3259,14 @@ class TestHttpRequestRejected(unittest.TestCase):
             proxy.CRLF
         ]))
 
+    def test_status_code_without_reason_response(self) -> None:
+        e = proxy.HttpRequestRejected(status_code=403)
+        self.assertEqual(e.response(self.request), proxy.CRLF.join([
+            b'HTTP/1.1 403',
+            proxy.PROXY_AGENT_HEADER,
+            proxy.CRLF
+        ]))
+
     def test_body_response(self) -> None:
         e = proxy.HttpRequestRejected(
             status_code=404, reason=b'NOT FOUND',
@@ -2151,6 +3279,18 @@ class TestHttpRequestRejected(unittest.TestCase):
             b'Nothing here'
         ]))
 
+    def test_mutable_body_and_reason_response(self) -> None:
+        e = proxy.HttpRequestRejected(
+            status_code=404, reason=bytearray(b'NOT FOUND'),
+            body=bytearray(b'Nothing here'))
+        self.assertEqual(e.response(self.request), proxy.CRLF.join([
+            b'HTTP/1.1 404 NOT FOUND',
+            proxy.PROXY_AGENT_HEADER,
+            b'Content-Length: 12',
+            proxy.CRLF,
+            b'Nothing here'
+        ]))
+
 
 class TestMain(unittest.TestCase):
 
@@ -2169,6 +3309,7 @@ class TestMain(unittest.TestCase):
         mock_args.basic_auth = proxy.DEFAULT_BASIC_AUTH
         mock_args.hostname = proxy.DEFAULT_IPV6_HOSTNAME
         mock_args.port = proxy.DEFAULT_PORT
+        mock_args.backlog = proxy.DEFAULT_BACKLOG
         mock_args.num_workers = proxy.DEFAULT_NUM_WORKERS
         mock_args.disable_http_proxy = proxy.DEFAULT_DISABLE_HTTP_PROXY
         mock_args.enable_web_server = proxy.DEFAULT_ENABLE_WEB_SERVER
@@ -2183,8 +3324,10 @@ class TestMain(unittest.TestCase):
         mock_args.devtools_ws_path = proxy.DEFAULT_DEVTOOLS_WS_PATH
         mock_args.timeout = proxy.DEFAULT_TIMEOUT
         mock_args.threadless = proxy.DEFAULT_THREADLESS
+        mock_args.enable_reuse_port = proxy.DEFAULT_ENABLE_REUSE_PORT
+        mock_args.enable_upstream_keep_alive = proxy.DEFAULT_ENABLE_UPSTREAM_KEEP_ALIVE
 
-    @mock.patch('time.sleep')
+    @mock.patch('proxy.wait_for_shutdown_signal')
     @mock.patch('proxy.load_plugins')
     @mock.patch('proxy.init_parser')
     @mock.patch('proxy.set_open_file_limit')
@@ -2199,8 +3342,8 @@ class TestMain(unittest.TestCase):
             mock_set_open_file_limit: mock.Mock,
             mock_init_parser: mock.Mock,
             mock_load_plugins: mock.Mock,
-            mock_sleep: mock.Mock) -> None:
-        mock_sleep.side_effect = KeyboardInterrupt()
+            mock_wait_for_shutdown_signal: mock.Mock) -> None:
+        mock_wait_for_shutdown_signal.side_effect = KeyboardInterrupt()
 
         mock_args = mock_init_parser.return_value.parse_args.return_value
         self.mock_default_args(mock_args)
@@ -2218,7 +3361,7 @@ class TestMain(unittest.TestCase):
 
         mock_protocol_config.assert_called_with(
             auth_code=mock_args.basic_auth,
-            backlog=mock_args.backlog,
+            backlog=proxy.listen_backlog(mock_args.backlog),
             ca_cert_dir=mock_args.ca_cert_dir,
             ca_cert_file=mock_args.ca_cert_file,
             ca_key_file=mock_args.ca_key_file,
@@ -2227,7 +3370,7 @@ class TestMain(unittest.TestCase):
             client_recvbuf_size=mock_args.client_recvbuf_size,
             hostname=mock_args.hostname,
             keyfile=mock_args.key_file,
-            num_workers=multiprocessing.cpu_count(),
+            num_workers=proxy.default_num_workers(),
             pac_file=mock_args.pac_file,
             pac_file_url_path=mock_args.pac_file_url_path,
             port=mock_args.port,
@@ -2241,6 +3384,8 @@ class TestMain(unittest.TestCase):
             devtools_ws_path=proxy.DEFAULT_DEVTOOLS_WS_PATH,
             timeout=proxy.DEFAULT_TIMEOUT,
             threadless=proxy.DEFAULT_THREADLESS,
+            reuse_port=proxy.DEFAULT_ENABLE_REUSE_PORT,
+            enable_upstream_keep_alive=proxy.DEFAULT_ENABLE_UPSTREAM_KEEP_ALIVE,
         )
 
         mock_acceptor_pool.assert_called_with(
@@ -2250,28 +3395,29 @@ class TestMain(unittest.TestCase):
             num_workers=mock_protocol_config.return_value.num_workers,
             work_klass=proxy.ProtocolHandler,
             threadless=mock_protocol_config.return_value.threadless,
+            reuse_port=mock_protocol_config.return_value.reuse_port,
             config=mock_protocol_config.return_value,
         )
+        mock_protocol_config.return_value.warm_ssl_contexts.assert_called_once()
         mock_acceptor_pool.return_value.setup.assert_called()
         mock_acceptor_pool.return_value.shutdown.assert_called()
-        mock_sleep.assert_called_with(1)
+        mock_wait_for_shutdown_signal.assert_called_once_with()
 
-    @mock.patch('time.sleep')
-    @mock.patch('os.remove')
-    @mock.patch('os.path.exists')
-    @mock.patch('builtins.open')
+    @mock.patch('proxy.wait_for_shutdown_signal')
     @mock.patch('proxy.init_parser')
     @mock.patch('proxy.AcceptorPool')
     def test_pid_file_is_written_and_removed(
             self,
             mock_acceptor_pool: mock.Mock,
             mock_init_parser: mock.Mock,
-            mock_open: mock.Mock,
-            mock_exists: mock.Mock,
-            mock_remove: mock.Mock,
-            mock_sleep: mock.Mock) -> None:
+            mock_wait_for_shutdown_signal: mock.Mock) -> None:
         pid_file = get_temp_file('proxy.pid')
-        mock_sleep.side_effect = KeyboardInterrupt()
+        written: List[Optional[int]] = []
+
+        def wait_for_shutdown_signal() -> None:
+            written.append(proxy.read_pid_file(pid_file))
+            raise KeyboardInterrupt()
+        mock_wait_for_shutdown_signal.side_effect = wait_for_shutdown_signal
         mock_args = mock_init_parser.return_value.parse_args.return_value
         self.mock_default_args(mock_args)
         mock_args.pid_file = pid_file
@@ -2279,21 +3425,50 @@ class TestMain(unittest.TestCase):
         mock_init_parser.assert_called()
         mock_acceptor_pool.assert_called()
         mock_acceptor_pool.return_value.setup.assert_called()
-        mock_open.assert_called_with(pid_file, 'wb')
-        mock_open.return_value.__enter__.return_value.write.assert_called_with(
-            proxy.bytes_(os.getpid()))
-        mock_exists.assert_called_with(pid_file)
-        mock_remove.assert_called_with(pid_file)
+        self.assertEqual(written, [os.getpid()])
+        self.assertFalse(os.path.exists(pid_file))
+
+    @mock.patch('os.kill')
+    def test_pid_file_is_stale_on_windows(self, mock_kill: mock.Mock) -> None:
+        with mock.patch('os.name', 'nt'):
+            self.assertFalse(proxy.is_process_running(os.getpid()))
+        mock_kill.assert_not_called()
 
-    @mock.patch('time.sleep')
+    @mock.patch('proxy.is_process_running', return_value=False)
+    def test_stale_pid_file_is_replaced(self, mock_is_process_running: mock.Mock) -> None:
+        pid_file = get_temp_file('proxy.pid')
+        with open(pid_file, 'wb') as f:
+            f.write(b'999999')
+        try:
+            proxy.write_pid_file(pid_file)
+            mock_is_process_running.assert_called_once_with(999999)
+            self.assertEqual(proxy.read_pid_file(pid_file), os.getpid())
+        finally:
+            proxy.remove_pid_file(pid_file)
+        self.assertFalse(os.path.exists(pid_file))
+
+    @mock.patch('proxy.is_process_running', return_value=True)
+    def test_running_pid_file_is_kept(self, _mock_is_process_running: mock.Mock) -> None:
+        pid_file = get_temp_file('proxy.pid')
+        with open(pid_file, 'wb') as f:
+            f.write(b'999999')
+        try:
+            with self.assertRaises(FileExistsError):
+                proxy.write_pid_file(pid_file)
+            proxy.remove_pid_file(pid_file)
+            self.assertEqual(proxy.read_pid_file(pid_file), 999999)
+        finally:
+            os.unlink(pid_file)
+
+    @mock.patch('proxy.wait_for_shutdown_signal')
     @mock.patch('proxy.ProtocolConfig')
     @mock.patch('proxy.AcceptorPool')
     def test_basic_auth(
             self,
             mock_acceptor_pool: mock.Mock,
             mock_protocol_config: mock.Mock,
-            mock_sleep: mock.Mock) -> None:
-        mock_sleep.side_effect = KeyboardInterrupt()
+            mock_wait_for_shutdown_signal: mock.Mock) -> None:
+        mock_wait_for_shutdown_signal.side_effect = KeyboardInterrupt()
         proxy.main(['--basic-auth', 'user:pass'])
         config = mock_protocol_config.return_value
         mock_acceptor_pool.assert_called_with(
@@ -2303,9 +3478,46 @@ class TestMain(unittest.TestCase):
             num_workers=config.num_workers,
             work_klass=proxy.ProtocolHandler,
             threadless=config.threadless,
+            reuse_port=config.reuse_port,
             config=config)
         self.assertEqual(mock_protocol_config.call_args[1]['auth_code'], b'Basic dXNlcjpwYXNz')
 
+    @mock.patch('proxy.wait_for_shutdown_signal')
+    @mock.patch('proxy.ProtocolConfig')
+    @mock.patch('proxy.AcceptorPool')
+    def test_enable_reuse_port(
+            self,
+            _mock_acceptor_pool: mock.Mock,
+            mock_protocol_config: mock.Mock,
+            mock_wait_for_shutdown_signal: mock.Mock) -> None:
+        mock_wait_for_shutdown_signal.side_effect = KeyboardInterrupt()
+        proxy.main(['--enable-reuse-port'])
+        self.assertTrue(mock_protocol_config.call_args[1]['reuse_port'])
+
+    @unittest.skipIf(os.name == 'nt', 'SIGTERM terminates process on Windows')
+    def test_wait_for_shutdown_signal_returns_on_sigterm(self) -> None:
+        previous = signal.getsignal(signal.SIGTERM)
+        timer = threading.Timer(0.1, os.kill, (os.getpid(), signal.SIGTERM))
+        timer.start()
+        try:
+            proxy.wait_for_shutdown_signal()
+        finally:
+            timer.cancel()
+        self.assertIs(signal.getsignal(signal.SIGTERM), previous)
+
+    @mock.patch('builtins.open', new_callable=mock.mock_open, read_data=b'128\n')
+    def test_listen_backlog_capped_at_somaxconn(self, _mock_open: mock.Mock) -> None:
+        self.assertEqual(proxy.listen_backlog(1024), 128)
+        self.assertEqual(proxy.listen_backlog(64), 64)
+
+    @mock.patch('builtins.open', side_effect=FileNotFoundError())
+    def test_listen_backlog_without_somaxconn(self, _mock_open: mock.Mock) -> None:
+        self.assertEqual(proxy.listen_backlog(1024), 1024)
+
+    @mock.patch('os.sched_getaffinity', create=True, return_value={0, 1})
+    def test_default_num_workers_respects_affinity(self, _mock_affinity: mock.Mock) -> None:
+        self.assertEqual(proxy.default_num_workers(), 2)
+
     @mock.patch('builtins.print')
     def test_main_version(
             self,
@@ -2314,7 +3526,7 @@ class TestMain(unittest.TestCase):
             proxy.main(['--version'])
             mock_print.assert_called_with(proxy.text_(proxy.version))
 
-    @mock.patch('time.sleep')
+    @mock.patch('proxy.wait_for_shutdown_signal')
     @mock.patch('builtins.print')
     @mock.patch('proxy.AcceptorPool')
     @mock.patch('proxy.is_py3')
@@ -2323,8 +3535,8 @@ class TestMain(unittest.TestCase):
             mock_is_py3: mock.Mock,
             mock_acceptor_pool: mock.Mock,
             mock_print: mock.Mock,
-            mock_sleep: mock.Mock) -> None:
-        mock_sleep.side_effect = KeyboardInterrupt()
+            mock_wait_for_shutdown_signal: mock.Mock) -> None:
+        mock_wait_for_shutdown_signal.side_effect = KeyboardInterrupt()
         mock_is_py3.return_value = True
         proxy.main([])
         mock_is_py3.assert_called()